@@ -6,12 +6,68 @@ Supports Ollama (local), OpenAI, and Anthropic.
 """
 
 import json
-import requests
+import threading
+import httpx
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 from collections import Counter, defaultdict
 import re
 
+# Try optional imports
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+# Keep-alive HTTP clients shared by every AIService (and so every session)
+# talking to the same endpoint. Keyed on the connection only - provider,
+# base URL and API key - so model or temperature changes reuse the pool.
+# Endpoints are few, so clients live for the process and are never closed.
+_http_clients: Dict[tuple, httpx.Client] = {}
+_http_clients_lock = threading.Lock()
+
+def _shared_http_client(key: tuple) -> httpx.Client:
+    """Get (or create) the pooled HTTP client for a connection key."""
+    with _http_clients_lock:
+        client = _http_clients.get(key)
+        if client is None:
+            client = _http_clients[key] = httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(60.0, connect=5.0),
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+            )
+        return client
+
+
+# Bump when categorize_tickets changes how tickets are packed into the
+# request; with the system prompt below it scopes the category cache, so
+# either change invalidates categories cached under the old prompt.
+CATEGORIZE_PROMPT_VERSION = 1
+
+# System prompt for categorize_tickets
+CATEGORIZE_SYSTEM_PROMPT = """You are a support ticket categorization expert.
+Analyze each ticket and assign ONE category from this list:
+- Bug Report: Software errors, crashes, broken features
+- Feature Request: New features, enhancements, improvements
+- Configuration: Setup, settings, configuration issues
+- License/Activation: License keys, activation, subscription
+- Sync/Connection: Network, sync, offline mode, connectivity
+- Training/How-to: Questions about using features, documentation
+- Data Issue: Wrong data, missing data, data corruption
+- Integration: API, third-party integrations, imports/exports
+- Performance: Slow, timeout, resource issues
+- Access/Permission: Login, access rights, permissions
+- Billing: Invoice, payment, subscription
+- Hardware: Device, equipment, physical issues
+- General Inquiry: Other questions
+
+IMPORTANT: Respond ONLY with valid JSON like:
+{"123": "Bug Report", "456": "Configuration"}
+
+No explanations, no markdown, just the JSON object."""
+
 
 @dataclass
 class AIConfig:
@@ -29,16 +85,29 @@ class AIService:
     def __init__(self, config: AIConfig = None):
         self.config = config or AIConfig()
         self._last_error = None
+        self._openai_client = None
     
     @property
     def last_error(self) -> Optional[str]:
         return self._last_error
     
+    @property
+    def category_cache_scope(self) -> str:
+        """What a cached category depends on besides the ticket text."""
+        return (f"{self.config.provider}\0{self.config.model}\0"
+                f"v{CATEGORIZE_PROMPT_VERSION}\0{CATEGORIZE_SYSTEM_PROMPT}")
+    
+    @property
+    def http(self) -> httpx.Client:
+        """Pooled keep-alive HTTP client, shared by every service on this endpoint."""
+        return _shared_http_client((self.config.provider, self.config.base_url, self.config.api_key))
+    
     def test_connection(self) -> bool:
         """Test if AI service is available."""
+        self._last_error = None
         try:
             if self.config.provider == 'ollama':
-                resp = requests.get(f"{self.config.base_url}/api/tags", timeout=5)
+                resp = self.http.get(f"{self.config.base_url}/api/tags", timeout=5)
                 return resp.status_code == 200
             elif self.config.provider == 'openai':
                 # Would need API key validation
@@ -48,7 +117,7 @@ class AIService:
             self._last_error = str(e)
             return False
     
-    def _call_ollama(self, prompt: str, system: str = None) -> Optional[str]:
+    def _call_ollama(self, prompt: str, system: str = None, json_mode: bool = False) -> Optional[str]:
         """Call Ollama API."""
         try:
             payload = {
@@ -61,8 +130,10 @@ class AIService:
             }
             if system:
                 payload['system'] = system
+            if json_mode:
+                payload['format'] = 'json'
             
-            resp = requests.post(
+            resp = self.http.post(
                 f"{self.config.base_url}/api/generate",
                 json=payload,
                 timeout=120  # 2 min timeout for large prompts
@@ -77,33 +148,43 @@ class AIService:
             self._last_error = str(e)
             return None
     
-    def _call_openai(self, prompt: str, system: str = None) -> Optional[str]:
+    def _call_openai(self, prompt: str, system: str = None, json_mode: bool = False) -> Optional[str]:
         """Call OpenAI API."""
         try:
-            import openai
-            client = openai.OpenAI(api_key=self.config.api_key)
+            if self._openai_client is None:
+                import openai
+                self._openai_client = openai.OpenAI(api_key=self.config.api_key, http_client=self.http)
+            client = self._openai_client
             
             messages = []
             if system:
                 messages.append({"role": "system", "content": system})
             messages.append({"role": "user", "content": prompt})
             
+            kwargs = {}
+            if json_mode:
+                kwargs['response_format'] = {'type': 'json_object'}
+            
             response = client.chat.completions.create(
                 model=self.config.model or "gpt-4o-mini",
                 messages=messages,
                 temperature=self.config.temperature,
+                **kwargs,
             )
             return response.choices[0].message.content
         except Exception as e:
             self._last_error = str(e)
             return None
     
-    def call(self, prompt: str, system: str = None) -> Optional[str]:
-        """Call the configured AI provider."""
+    def call(self, prompt: str, system: str = None, json_mode: bool = False) -> Optional[str]:
+        """Call the configured AI provider.
+        
+        With json_mode the provider is asked to constrain output to a JSON object.
+        """
         if self.config.provider == 'ollama':
-            return self._call_ollama(prompt, system)
+            return self._call_ollama(prompt, system, json_mode)
         elif self.config.provider == 'openai':
-            return self._call_openai(prompt, system)
+            return self._call_openai(prompt, system, json_mode)
         else:
             self._last_error = f"Unknown provider: {self.config.provider}"
             return None
@@ -115,47 +196,27 @@ class AIService:
         """
         categories = {}
         
-        system_prompt = """You are a support ticket categorization expert.
-Analyze each ticket and assign ONE category from this list:
-- Bug Report: Software errors, crashes, broken features
-- Feature Request: New features, enhancements, improvements
-- Configuration: Setup, settings, configuration issues
-- License/Activation: License keys, activation, subscription
-- Sync/Connection: Network, sync, offline mode, connectivity
-- Training/How-to: Questions about using features, documentation
-- Data Issue: Wrong data, missing data, data corruption
-- Integration: API, third-party integrations, imports/exports
-- Performance: Slow, timeout, resource issues
-- Access/Permission: Login, access rights, permissions
-- Billing: Invoice, payment, subscription
-- Hardware: Device, equipment, physical issues
-- General Inquiry: Other questions
-
-IMPORTANT: Respond ONLY with valid JSON like:
-{"123": "Bug Report", "456": "Configuration"}
-
-No explanations, no markdown, just the JSON object."""
+        system_prompt = CATEGORIZE_SYSTEM_PROMPT
 
-        for i in range(0, len(tickets), batch_size):
-            batch = tickets[i:i+batch_size]
+        # Tickets with identical text (canned replies, auto-notifications) are
+        # sent once and the result is copied to the rest of the group
+        groups = defaultdict(list)
+        for t in tickets:
+            groups[t.slug].append(t)
+        unique = [group[0] for group in groups.values()]
+        
+        for i in range(0, len(unique), batch_size):
+            batch = unique[i:i+batch_size]
             
-            # Build prompt with ticket info
-            ticket_lines = []
-            for t in batch:
-                subject = (t.subject or '')[:100].replace('"', "'")
-                desc = ''
-                if hasattr(t, 'description') and t.description:
-                    desc = t.description[:150].replace('"', "'").replace('\n', ' ')
-                ticket_lines.append(f"ID {t.id}: {subject}")
-                if desc:
-                    ticket_lines.append(f"  Description: {desc}")
+            # Pack the whole batch into one prompt as a JSON array
+            ticket_data = [{'id': t.id, 'text': t.slug} for t in batch]
             
-            prompt = f"Categorize these {len(batch)} support tickets:\n\n" + "\n".join(ticket_lines)
+            prompt = f"Categorize these {len(batch)} support tickets:\n\n" + json.dumps(ticket_data, ensure_ascii=False)
             
             # Try up to 3 times
             response = None
             for attempt in range(3):
-                response = self.call(prompt, system_prompt)
+                response = self.call(prompt, system_prompt, json_mode=True)
                 if response and '{' in response:
                     break
             
@@ -169,6 +230,10 @@ No explanations, no markdown, just the JSON object."""
             parsed = self._parse_categories_response(response, batch)
             categories.update(parsed)
         
+        for group in groups.values():
+            for t in group[1:]:
+                categories[t.id] = categories[group[0].id]
+        
         return categories
     
     def _parse_categories_response(self, response: str, batch: List[Any]) -> Dict[int, str]:
@@ -178,10 +243,13 @@ No explanations, no markdown, just the JSON object."""
         
         # Strategy 1: Direct JSON parse
         try:
-            # Look for JSON object in response
-            json_match = re.search(r'\{[^{}]*\}', response, re.DOTALL)
-            if json_match:
-                parsed = json.loads(json_match.group())
+            # JSON mode returns the bare object; otherwise look for one in the text
+            json_text = response.strip()
+            if not json_text.startswith('{'):
+                json_match = re.search(r'\{[^{}]*\}', response, re.DOTALL)
+                json_text = json_match.group() if json_match else ''
+            if json_text:
+                parsed = json.loads(json_text)
                 for k, v in parsed.items():
                     tid = int(k)
                     if tid in batch_ids:
@@ -602,7 +670,11 @@ Respond with ONLY JSON array:
 
 
 def get_ai_service(config: Dict = None) -> AIService:
-    """Get AI service instance from config dict."""
+    """Get AI service instance from config dict.
+    
+    The service itself is per call (it holds the caller's last_error); only
+    its HTTP connection pool is shared, per endpoint.
+    """
     ai_config = AIConfig()
     
     if config:
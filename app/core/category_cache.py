@@ -0,0 +1,139 @@
+"""
+Category Cache
+==============
+Persistent cache of AI ticket categories keyed by ticket content.
+
+Keys are a hash of the text actually sent to the LLM (``Ticket.slug``) under
+a scope naming the provider, model and prompt that produced the category,
+so a ticket categorized in any earlier run - under a different sample size,
+after a Clear, or with a re-imported dataset - is never sent again unless
+its text or the AI settings changed.
+
+Persistence: SQLite file on disk, one transaction per batch.
+"""
+
+import sqlite3
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+
+class CategoryCache:
+    """
+    Content-addressed ticket category cache.
+
+    Usage:
+        cache = CategoryCache()
+        scope = ai_service.category_cache_scope
+        hits = cache.get_many(batch, scope)
+        misses = [t for t in batch if t.id not in hits]
+        cache.put_many(misses, ai_service.categorize_tickets(misses), scope)
+    """
+
+    def __init__(self, cache_dir: str = None):
+        if cache_dir is None:
+            cache_dir = Path(__file__).parent.parent / ".ftex_cache"
+
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.cache_dir / "category_cache.db"
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cat_cache ("
+            "h BLOB PRIMARY KEY, category TEXT NOT NULL, ts INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _scope_hasher(scope: str):
+        """Hasher primed with the scope; copied once per ticket."""
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(scope.encode('utf-8') + b'\0')
+        return hasher
+
+    @staticmethod
+    def content_hash(ticket, hasher) -> bytes:
+        """Hash of the ticket text sent to the LLM, under a scope hasher."""
+        h = hasher.copy()
+        h.update(ticket.slug.encode('utf-8'))
+        return h.digest()
+
+    def get_many(self, tickets: List[Any], scope: str) -> Dict[int, str]:
+        """Look up cached categories. Returns ticket_id -> category for hits only."""
+        if not tickets:
+            return {}
+
+        hasher = self._scope_hasher(scope)
+        hashes = {}
+        for t in tickets:
+            hashes.setdefault(self.content_hash(t, hasher), []).append(t.id)
+
+        keys = list(hashes)
+        result = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i+500]
+                rows = self._conn.execute(
+                    f"SELECT h, category FROM cat_cache WHERE h IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for h, category in rows:
+                    for tid in hashes[h]:
+                        result[tid] = category
+        return result
+
+    def put_many(self, tickets: List[Any], categories: Dict[int, str], scope: str):
+        """Store categories for tickets. Failed ("Uncategorized") results are skipped."""
+        now = int(time.time())
+        hasher = self._scope_hasher(scope)
+        rows = [
+            (self.content_hash(t, hasher), categories[t.id], now)
+            for t in tickets
+            if categories.get(t.id) and categories[t.id] != 'Uncategorized'
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            try:
+                with self._conn:  # One transaction (and fsync) per batch
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO cat_cache (h, category, ts) VALUES (?, ?, ?)",
+                        rows,
+                    )
+            except sqlite3.Error as e:
+                print(f"Warning: Could not save category cache: {e}")
+
+    def clear(self):
+        """Remove all cached categories."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM cat_cache")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM cat_cache").fetchone()[0]
+        return {
+            'categories_cached': count,
+            'db_path': str(self.db_path),
+        }
+
+
+# =========================================================================
+# SINGLETON ACCESS
+# =========================================================================
+
+_category_cache_instance: Optional[CategoryCache] = None
+
+def get_category_cache() -> CategoryCache:
+    """Get singleton category cache instance."""
+    global _category_cache_instance
+    if _category_cache_instance is None:
+        _category_cache_instance = CategoryCache()
+    return _category_cache_instance
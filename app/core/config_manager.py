@@ -13,6 +13,12 @@ from typing import Dict, List, Any, Optional
 from datetime import date
 import json
 
+# libyaml-backed loader/dumper when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _YamlLoader, CSafeDumper as _YamlDumper
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader, SafeDumper as _YamlDumper
+
 
 # =============================================================================
 # DEFAULT CONFIGURATION
@@ -343,7 +349,7 @@ class ConfigManager:
         user_config_path = self.config_dir / 'user' / 'config.yaml'
         if user_config_path.exists():
             with open(user_config_path) as f:
-                user_config = yaml.safe_load(f)
+                user_config = yaml.load(f, Loader=_YamlLoader)
                 self._merge_config(user_config)
         
         # Load from environment
@@ -437,13 +443,28 @@ class ConfigManager:
         is_hol, _ = self.is_holiday(d)
         return not is_hol
     
-    def save(self, path: str = None):
-        """Save current configuration to file."""
+    def update_many(self, changes: Dict[tuple, Any]):
+        """Set several configuration values, given as {path: value}."""
+        for path, value in changes.items():
+            self._set_nested(path, value)
+    
+    def save(self, path: str = None) -> bool:
+        """Save current configuration to file.
+        
+        The YAML is rendered once and compared with the file on disk, so an
+        unchanged configuration is not rewritten. Otherwise it is written to
+        a temp file and swapped in. Returns True if the file was written.
+        """
         save_path = Path(path) if path else self.config_dir / 'user' / 'config.yaml'
-        save_path.parent.mkdir(parents=True, exist_ok=True)
+        payload = yaml.dump(self.config, Dumper=_YamlDumper, default_flow_style=False, sort_keys=False)
+        if save_path.exists() and save_path.read_text() == payload:
+            return False
         
-        with open(save_path, 'w') as f:
-            yaml.dump(self.config, f, default_flow_style=False, sort_keys=False)
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = save_path.with_suffix(save_path.suffix + '.tmp')
+        tmp_path.write_text(payload)
+        os.replace(tmp_path, save_path)
+        return True
     
     def to_dict(self) -> dict:
         """Return configuration as dictionary."""
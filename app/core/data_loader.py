@@ -9,11 +9,13 @@ import json
 import csv
 import re
 import html
+import sys
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 from collections import Counter, defaultdict
 from dataclasses import dataclass, field
+from functools import cached_property
 import io
 
 # Try optional imports
@@ -121,6 +123,29 @@ class Ticket:
         end = self.resolved_at or datetime.now()
         return (end - self.created_at).days
     
+    @cached_property
+    def day_key(self) -> Optional[str]:
+        """Created date as '%Y-%m-%d', formatted once per ticket."""
+        return sys.intern(self.created_at.strftime('%Y-%m-%d')) if self.created_at else None
+    
+    @cached_property
+    def search_text(self) -> str:
+        """Lowercased subject and description, newline-joined, for keyword matching."""
+        return f"{self.subject or ''}\n{self.description or ''}".lower()
+    
+    @cached_property
+    def slug(self) -> str:
+        """Truncated, whitespace-collapsed subject + description sent to the LLM."""
+        text = f"{(self.subject or '')[:100]} | {(self.description or '')[:150]}"
+        return re.sub(r'\s+', ' ', text).strip()
+    
+    def __getstate__(self):
+        # Keep the tickets cache lean: cached properties rebuild on demand
+        state = self.__dict__.copy()
+        for key in ('day_key', 'search_text', 'slug'):
+            state.pop(key, None)
+        return state
+    
     @classmethod
     def from_dict(cls, data: Dict, config: Dict = None) -> 'Ticket':
         """Create Ticket from raw dictionary data."""
@@ -6,12 +6,21 @@ Provides automatic persistence to disk for data that must survive page refreshes
 """
 
 import streamlit as st
+import numpy as np
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 import pickle
 import json
+import os
 from pathlib import Path
 
+# Try optional imports
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 
 # =============================================================================
 # CACHE CONFIGURATION
@@ -24,6 +33,29 @@ CACHE_DIR.mkdir(parents=True, exist_ok=True)
 TICKETS_CACHE = CACHE_DIR / 'tickets_cache.pkl'
 STATE_CACHE = CACHE_DIR / 'state_cache.json'
 AI_CACHE = CACHE_DIR / 'ai_analysis_cache.json'
+AI_CHECKPOINT = CACHE_DIR / 'ai_checkpoint.jsonl'
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize to JSON bytes, using orjson when available."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=str).encode('utf-8')
+
+
+def _loads(data: bytes) -> Any:
+    """Parse JSON bytes, using orjson when available."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _write_atomic(path: Path, payload: bytes):
+    """Write to a temp file and swap it in, so a crash never leaves a torn cache."""
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
 
 
 # =============================================================================
@@ -121,8 +153,7 @@ def _save_state():
             'analysis_results': st.session_state.get('analysis_results', {}),
             'timestamp': datetime.now().isoformat(),
         }
-        with open(STATE_CACHE, 'w') as f:
-            json.dump(state, f, indent=2)
+        _write_atomic(STATE_CACHE, _dumps(state))
     except Exception as e:
         print(f"[StateManager] Error saving state: {e}")
 
@@ -136,7 +167,7 @@ def _save_ai_analysis():
         # Convert any sets to lists for JSON serialization
         def make_serializable(obj):
             if isinstance(obj, set):
-                return list(obj)
+                return sorted(obj)
             elif isinstance(obj, dict):
                 return {k: make_serializable(v) for k, v in obj.items()}
             elif isinstance(obj, list):
@@ -150,8 +181,11 @@ def _save_ai_analysis():
         }
         
         # Always save, even if data is empty (so we can see the file exists)
-        with open(AI_CACHE, 'w') as f:
-            json.dump(ai_data, f, indent=2, default=str)
+        _write_atomic(AI_CACHE, _dumps(ai_data))
+        
+        # Session state now holds everything in the checkpoint log - compact it
+        if AI_CHECKPOINT.exists():
+            AI_CHECKPOINT.unlink()
         
         # Log what was saved
         enrichment_count = len(ai_enrichment.get('categories', {}))
@@ -163,6 +197,35 @@ def _save_ai_analysis():
         traceback.print_exc()
 
 
+def append_ai_checkpoint(categories: Dict[int, str]):
+    """Append a batch of new AI categories to the checkpoint log.
+    
+    Cheap incremental alternative to save_to_cache() during long analysis
+    runs: only the delta is written. The log is folded into the AI cache
+    on the next full save.
+    """
+    try:
+        line = _dumps({'categories': categories}) + b'\n'
+        with open(AI_CHECKPOINT, 'ab') as f:
+            f.write(line)
+            f.flush()
+    except Exception as e:
+        print(f"[StateManager] Error appending AI checkpoint: {e}")
+
+
+def clear_ai_checkpoint():
+    """Discard the checkpoint log, e.g. when a fresh (non-resume) run starts.
+    
+    Leftover lines from a run that died before its next full save would
+    otherwise be replayed over the new run's results on the next load.
+    """
+    try:
+        if AI_CHECKPOINT.exists():
+            AI_CHECKPOINT.unlink()
+    except Exception as e:
+        print(f"[StateManager] Error clearing AI checkpoint: {e}")
+
+
 # =============================================================================
 # RESTORE FUNCTIONS
 # =============================================================================
@@ -172,6 +235,7 @@ def _restore_all_from_cache():
     _restore_tickets()
     _restore_state()
     _restore_ai_analysis()
+    _replay_ai_checkpoint()
     _apply_ai_to_tickets()  # Apply AI enrichment to tickets
 
 
@@ -211,8 +275,8 @@ def _restore_state():
     """Restore general state from JSON file."""
     try:
         if STATE_CACHE.exists():
-            with open(STATE_CACHE, 'r') as f:
-                state = json.load(f)
+            with open(STATE_CACHE, 'rb') as f:
+                state = _loads(f.read())
             
             st.session_state.data_loaded = state.get('data_loaded', False)
             st.session_state.file_path = state.get('file_path', '')
@@ -227,10 +291,19 @@ def _restore_ai_analysis():
     """Restore AI analysis from JSON file."""
     try:
         if AI_CACHE.exists():
-            with open(AI_CACHE, 'r') as f:
-                ai_data = json.load(f)
+            with open(AI_CACHE, 'rb') as f:
+                ai_data = _loads(f.read())
             
-            st.session_state.ai_enrichment = ai_data.get('ai_enrichment', {})
+            ai_enrichment = ai_data.get('ai_enrichment', {})
+            if ai_enrichment.get('categories'):
+                # JSON object keys are strings; ticket ids are ints
+                ai_enrichment['categories'] = {
+                    int(k): v for k, v in ai_enrichment['categories'].items()
+                }
+            if 'analyzed_ticket_ids' in ai_enrichment:
+                # Kept as a set in memory so membership tests and per-batch updates are O(1)
+                ai_enrichment['analyzed_ticket_ids'] = set(ai_enrichment['analyzed_ticket_ids'])
+            st.session_state.ai_enrichment = ai_enrichment
             st.session_state.deep_analysis = ai_data.get('deep_analysis', {})
             
             timestamp = ai_data.get('timestamp', 'unknown')
@@ -241,6 +314,39 @@ def _restore_ai_analysis():
         print(f"[StateManager] Error restoring AI analysis: {e}")
 
 
+def _replay_ai_checkpoint():
+    """Merge batches from an interrupted analysis run into the AI enrichment."""
+    try:
+        if not AI_CHECKPOINT.exists():
+            return
+        
+        ai_enrichment = dict(st.session_state.get('ai_enrichment', {}))
+        categories = dict(ai_enrichment.get('categories', {}))
+        batches = 0
+        with open(AI_CHECKPOINT, 'rb') as f:
+            for line in f:
+                try:
+                    delta = _loads(line)
+                except ValueError:
+                    break  # Torn final line from an interrupted write
+                categories.update({int(k): v for k, v in delta.get('categories', {}).items()})
+                batches += 1
+        
+        if batches:
+            analyzed_ids = set(ai_enrichment.get('analyzed_ticket_ids', set()))
+            analyzed_ids.update(categories)
+            ai_enrichment.update({
+                'categories': categories,
+                'analyzed_ticket_ids': analyzed_ids,
+                'analyzed_count': len(analyzed_ids),
+                'in_progress': True,
+            })
+            st.session_state.ai_enrichment = ai_enrichment
+            print(f"[StateManager] Replayed {batches} AI checkpoint batches")
+    except Exception as e:
+        print(f"[StateManager] Error replaying AI checkpoint: {e}")
+
+
 # =============================================================================
 # CLEAR FUNCTIONS
 # =============================================================================
@@ -248,7 +354,7 @@ def _restore_ai_analysis():
 def clear_cache():
     """Clear all cache files from disk."""
     try:
-        for cache_file in [TICKETS_CACHE, STATE_CACHE, AI_CACHE]:
+        for cache_file in [TICKETS_CACHE, STATE_CACHE, AI_CACHE, AI_CHECKPOINT]:
             if cache_file.exists():
                 cache_file.unlink()
         return True
@@ -278,10 +384,27 @@ def clear_data():
 # =============================================================================
 
 def apply_filters(tickets: list) -> list:
-    """Apply current filter settings to ticket list."""
+    """Apply current filter settings to ticket list.
+    
+    For the session's own ticket list the result is memoized on the filter
+    signature and the AI enrichment timestamp (the category filter reads
+    AI-assigned categories), so every page rerun reuses one filtered list.
+    """
     if not tickets:
         return []
     
+    if tickets is not st.session_state.get('tickets'):
+        return _apply_filters(tickets)
+    
+    stamp = (get_filter_signature(), st.session_state.get('ai_enrichment', {}).get('timestamp'))
+    if st.session_state.get('_filtered_tickets_stamp') != stamp:
+        st.session_state['_filtered_tickets'] = _apply_filters(tickets)
+        st.session_state['_filtered_tickets_stamp'] = stamp
+    return st.session_state['_filtered_tickets']
+
+
+def _apply_filters(tickets: list) -> list:
+    """Filter `tickets` by the current sidebar selections."""
     filtered = tickets
     
     # Company filter
@@ -325,6 +448,143 @@ def apply_filters(tickets: list) -> list:
     return filtered
 
 
+def get_filter_signature() -> tuple:
+    """Hashable fingerprint of the loaded tickets and active filters.
+    
+    Two calls return the same value exactly when apply_filters() on the
+    session tickets would return the same subset, so it can key caches of
+    anything derived from the filtered list.
+    """
+    tickets = st.session_state.get('tickets', [])
+    date_range = st.session_state.get('date_range')
+    return (
+        id(tickets),
+        len(tickets),
+        st.session_state.get('selected_company', 'All'),
+        st.session_state.get('selected_agent', 'All'),
+        st.session_state.get('selected_status', 'All'),
+        st.session_state.get('selected_priority', 'All'),
+        st.session_state.get('selected_category', 'All'),
+        tuple(str(d) for d in date_range) if date_range else None,
+    )
+
+
+def get_ticket_arrays(tickets: list) -> Dict[str, Any]:
+    """Struct-of-arrays view of the filtered tickets for vectorized metrics.
+
+    `tickets` must be the apply_filters() result for the current filters.
+    Memoized in session state on the filter signature and the AI enrichment
+    timestamp (AI runs rewrite ticket categories), so the per-ticket
+    attribute walk happens once per filter change rather than once per
+    metric per rerun.
+    """
+    stamp = (get_filter_signature(), st.session_state.get('ai_enrichment', {}).get('timestamp'))
+    if st.session_state.get('_ticket_arrays_stamp') != stamp:
+        st.session_state['_ticket_arrays'] = _tickets_to_arrays(tickets)
+        st.session_state['_ticket_arrays_stamp'] = stamp
+    return st.session_state['_ticket_arrays']
+
+
+def _tickets_to_arrays(tickets: list) -> Dict[str, Any]:
+    """Flatten tickets into NumPy arrays (NaN/NaT/-1 for missing values)."""
+    n = len(tickets)
+    created = np.array(
+        [t.created_at.replace(tzinfo=None) if t.created_at else None for t in tickets],
+        dtype='datetime64[s]',
+    )
+    resolved = np.array(
+        [t.resolved_at.replace(tzinfo=None) if t.resolved_at else None for t in tickets],
+        dtype='datetime64[s]',
+    )
+    status = np.fromiter((t.status for t in tickets), dtype=np.int64, count=n)
+
+    week_keys, week_idx = week_index(created)
+
+    cat_labels, cat_first, cat_codes = np.unique(
+        np.array([t.category or 'Uncategorized' for t in tickets], dtype=object),
+        return_index=True, return_inverse=True,
+    )
+    cat_codes = cat_codes.reshape(-1)
+    cat_counts = np.bincount(cat_codes, minlength=len(cat_labels))
+
+    return {
+        'id': np.fromiter((t.id for t in tickets), dtype=np.int64, count=n),
+        'created': created,
+        'resolved': resolved,
+        'week_keys': week_keys,
+        'week_idx': week_idx,
+        'status': status,
+        'is_open': (status == 2) | (status == 3),
+        'priority': np.fromiter((t.priority for t in tickets), dtype=np.int64, count=n),
+        'responder_id': np.fromiter((t.responder_id or 0 for t in tickets), dtype=np.int64, count=n),  # 0 = unassigned
+        'frt': np.array([t.first_response_time for t in tickets], dtype=np.float64),
+        'res': np.array([t.resolution_time for t in tickets], dtype=np.float64),
+        'agent_messages': np.fromiter((t.agent_message_count for t in tickets), dtype=np.int64, count=n),
+        'cat_labels': cat_labels,
+        'cat_codes': cat_codes,
+        'cat_counts': cat_counts,
+        'cat_first': cat_first,  # Index of each category's first ticket
+        'has_category': np.fromiter((bool(t.category) for t in tickets), dtype=bool, count=n),
+        'entity_name': np.array([t.entity_name or '' for t in tickets], dtype=object),
+        'company_name': np.array([t.company_name or '' for t in tickets], dtype=object),
+    }
+
+
+def days_open(arrays: Dict[str, Any]) -> np.ndarray:
+    """Whole days each ticket has been open, like Ticket.days_open.
+    
+    Measured to resolution, or to now for unresolved tickets; 0 without a
+    creation time. Computed per call so cached arrays never go stale.
+    """
+    created, resolved = arrays['created'], arrays['resolved']
+    end = np.where(np.isnat(resolved), np.datetime64(datetime.now(), 's'), resolved)
+    start = np.where(np.isnat(created), end, created)
+    return (end - start) // np.timedelta64(1, 'D')
+
+
+def top_category_codes(arrays: Dict[str, Any], n: int) -> np.ndarray:
+    """Codes of the `n` largest categories in get_ticket_arrays() output.
+    
+    Ordered like Counter.most_common(): largest first, ties in order of
+    first appearance. np.partition narrows the candidates to the top `n`
+    (plus anything tied with the n-th) before the small final sort.
+    """
+    counts = arrays['cat_counts']
+    if counts.size > n:
+        cutoff = np.partition(counts, -n)[-n]
+        candidates = np.flatnonzero(counts >= cutoff)
+    else:
+        candidates = np.arange(counts.size)
+    order = np.lexsort((arrays['cat_first'][candidates], -counts[candidates]))
+    return candidates[order][:n]
+
+
+def week_index(created: np.ndarray):
+    """Bucket datetime64 timestamps into '%Y-W%W' weeks without strftime.
+    
+    Returns (week_keys, week_idx): the sorted distinct integer keys
+    (year * 100 + Monday-based week of year) and, per timestamp, its
+    position in week_keys, or -1 for NaT. Shared by every weekly chart;
+    labels are formatted with format_week_key() only for plotted weeks.
+    """
+    days = created.astype('datetime64[D]')
+    year = days.astype('datetime64[Y]')
+    yday = (days - year.astype('datetime64[D]')).astype(np.int64)
+    weekday = (days.astype(np.int64) + 3) % 7  # Monday = 0; 1970-01-01 was a Thursday
+    week = (year.astype(np.int64) + 1970) * 100 + (yday + 7 - weekday) // 7
+    
+    dated = ~np.isnat(created)
+    week_keys = np.unique(week[dated])
+    week_idx = np.full(created.size, -1, dtype=np.int64)
+    week_idx[dated] = np.searchsorted(week_keys, week[dated])
+    return week_keys, week_idx
+
+
+def format_week_key(key: int) -> str:
+    """Render a week_index() key as the '%Y-W%W' label."""
+    return f"{key // 100}-W{key % 100:02d}"
+
+
 def get_filtered_tickets() -> list:
     """Get tickets from session state with current filters applied."""
     tickets = st.session_state.get('tickets', [])
@@ -381,8 +641,8 @@ def get_cache_info() -> dict:
     
     if AI_CACHE.exists():
         try:
-            with open(AI_CACHE, 'r') as f:
-                ai_data = json.load(f)
+            with open(AI_CACHE, 'rb') as f:
+                ai_data = _loads(f.read())
             info['ai_timestamp'] = ai_data.get('timestamp', 'unknown')
             info['has_enrichment'] = bool(ai_data.get('ai_enrichment'))
             info['has_deep_analysis'] = bool(ai_data.get('deep_analysis'))
@@ -5,8 +5,8 @@ AI-powered issue clustering and root cause analysis.
 """
 
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
+import pandas as pd
+import numpy as np
 from datetime import datetime
 from collections import Counter, defaultdict
 import json
@@ -15,7 +15,10 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from core.session_state import init_session_state, apply_filters
+from core.session_state import (
+    init_session_state, apply_filters, get_filter_signature, get_ticket_arrays,
+    top_category_codes, format_week_key,
+)
 from core.config_manager import get_config
 from core.ui_components import inject_beta_badge
 
@@ -85,7 +88,7 @@ def render_ai_page():
         st.markdown("##### 📦 Saved Progress")
         
         ai_enrichment = st.session_state.get('ai_enrichment', {})
-        analyzed_ids = set(ai_enrichment.get('analyzed_ticket_ids', []))
+        analyzed_ids = ai_enrichment.get('analyzed_ticket_ids', set())
         in_progress = ai_enrichment.get('in_progress', False)
         
         if analyzed_ids:
@@ -96,7 +99,7 @@ def render_ai_page():
                 st.success(f"✅ Completed: {len(analyzed_ids):,} tickets")
             
             # Remaining count
-            remaining = len([t for t in tickets if t.id not in analyzed_ids])
+            remaining = len(_unanalyzed_index(tickets, analyzed_ids))
             if remaining > 0:
                 st.caption(f"📊 {remaining:,} remaining to analyze")
             
@@ -115,7 +118,7 @@ def render_ai_page():
                     st.rerun()
         else:
             st.info("No checkpoint saved yet")
-            st.caption("Progress saves automatically every 100 tickets, or when you click Stop")
+            st.caption("Progress is checkpointed after every batch, or when you click Stop")
         
         st.markdown("---")
         
@@ -181,6 +184,21 @@ def render_ai_page():
         st.subheader("Issue Clusters")
         st.caption("Similar tickets grouped by AI analysis")
         
+        # Filled below from session state, so a run that just finished shows its
+        # summary in this same pass instead of forcing a full-page rerun
+        summary_placeholder = st.empty()
+        
+        # Clicking Stop interrupts the running loop and reruns the page. The
+        # batches finished before the click are already in session state and
+        # the checkpoint file, so the rerun pauses there and saves for resume.
+        if st.session_state.pop('_stop_flag', False):
+            from core.session_state import save_to_cache
+            ai_enrichment = st.session_state.get('ai_enrichment', {})
+            _apply_categories(tickets, ai_enrichment.get('categories', {}))
+            save_to_cache()
+            st.info(f"⏸️ Paused! {ai_enrichment.get('analyzed_count', 0):,} tickets saved. "
+                    "💡 Click '▶️ Resume' in sidebar to continue")
+        
         # Run AI Analysis if button was clicked
         if st.session_state.get('run_ai_analysis'):
             st.session_state.run_ai_analysis = False  # Reset flag
@@ -188,8 +206,11 @@ def render_ai_page():
             with st.status("🤖 Running AI Analysis...", expanded=True) as status:
                 try:
                     from core.ai_service import get_ai_service
-                    from core.session_state import save_to_cache
+                    from core.session_state import save_to_cache, append_ai_checkpoint, clear_ai_checkpoint
+                    from core.category_cache import get_category_cache
                     ai_service = get_ai_service(ai_config)
+                    category_cache = get_category_cache()
+                    cache_scope = ai_service.category_cache_scope
                     
                     st.write("🔗 Connecting to AI model...")
                     if not ai_service.test_connection():
@@ -205,11 +226,11 @@ def render_ai_page():
                         if resume:
                             # Resume from checkpoint
                             existing_categories = existing_enrichment.get('categories', {})
-                            analyzed_ids = set(existing_enrichment.get('analyzed_ticket_ids', []))
+                            analyzed_ids = existing_enrichment.get('analyzed_ticket_ids', set())
                             st.write(f"📦 Resuming from checkpoint ({len(analyzed_ids):,} already done)")
                             
                             # Get unanalyzed tickets
-                            analysis_tickets = [t for t in tickets if t.id not in analyzed_ids]
+                            analysis_tickets = [tickets[i] for i in _unanalyzed_index(tickets, analyzed_ids)]
                             st.write(f"� {len(analysis_tickets):,} tickets remaining...")
                         else:
                             # Fresh start
@@ -217,6 +238,7 @@ def render_ai_page():
                             analysis_tickets = tickets[:sample_size]
                             existing_categories = {}
                             analyzed_ids = set()
+                            clear_ai_checkpoint()
                             st.write(f"📊 Analyzing {len(analysis_tickets):,} tickets (fresh start)...")
                         
                         # Categorize in batches
@@ -224,6 +246,10 @@ def render_ai_page():
                         batch_size = 25
                         new_categories = {}
                         
+                        # Grown in place per batch instead of re-merged from scratch
+                        all_categories = dict(existing_categories)
+                        all_analyzed_ids = set(analyzed_ids)
+                        
                         # Progress display
                         status_display = st.empty()
                         counter_display = st.empty()
@@ -231,14 +257,21 @@ def render_ai_page():
                         with prog_col:
                             progress = st.progress(0)
                         with stop_col:
-                            stop_btn = st.empty()
+                            # The click ends this run; the rerun sees the flag and pauses
+                            st.session_state['_stop_flag'] = False
+                            st.button("⏹️ Stop", key="stop_analysis", type="secondary",
+                                      on_click=_request_stop)
                         
-                        stopped = False
                         total_to_analyze = len(analysis_tickets)
                         total_batches = (total_to_analyze + batch_size - 1) // batch_size
                         processed = 0
                         batch_times = []
                         
+                        # Full saves rewrite the whole cache - only do ~50 per run,
+                        # the append-only checkpoint covers the batches in between
+                        save_every = max(1, total_batches // 50)
+                        batches_since_save = 0
+                        
                         # Show initial status
                         counter_display.markdown(f"### 📊 **0** / {total_to_analyze:,} tickets")
                         status_display.info(f"Starting analysis of {total_batches} batches...")
@@ -246,16 +279,18 @@ def render_ai_page():
                         import time
                         
                         for batch_num, i in enumerate(range(0, total_to_analyze, batch_size)):
-                            # Check for stop
-                            with stop_btn:
-                                if st.button("⏹️ Stop", key=f"stop_{i}", type="secondary"):
-                                    stopped = True
-                                    break
-                            
                             batch_start = time.time()
                             batch = analysis_tickets[i:i+batch_size]
-                            batch_cats = ai_service.categorize_tickets(batch, batch_size=batch_size)
+                            # Tickets whose text was categorized in any earlier run skip the LLM
+                            batch_cats = category_cache.get_many(batch, cache_scope)
+                            misses = [t for t in batch if t.id not in batch_cats]
+                            if misses:
+                                fresh_cats = ai_service.categorize_tickets(misses, batch_size=batch_size)
+                                category_cache.put_many(misses, fresh_cats, cache_scope)
+                                batch_cats.update(fresh_cats)
                             new_categories.update(batch_cats)
+                            all_categories.update(batch_cats)
+                            all_analyzed_ids.update(batch_cats.keys())
                             batch_time = time.time() - batch_start
                             batch_times.append(batch_time)
                             
@@ -273,60 +308,43 @@ def render_ai_page():
                             pct = processed / total_to_analyze
                             progress.progress(min(pct, 0.98))
                             
-                            # Save checkpoint after EVERY batch
-                            st.session_state.ai_enrichment = {
-                                'categories': {**existing_categories, **new_categories},
-                                'analyzed_ticket_ids': list(analyzed_ids | set(new_categories.keys())),
-                                'analyzed_count': len(analyzed_ids) + len(new_categories),
-                                'timestamp': datetime.now().isoformat(),
-                                'in_progress': True,
-                            }
-                            save_to_cache()
-                        
-                        # Merge all categories
-                        all_categories = {**existing_categories, **new_categories}
-                        all_analyzed_ids = analyzed_ids | set(new_categories.keys())
-                        
-                        # Apply categories to tickets
-                        for t in tickets:
-                            if t.id in all_categories:
-                                t.category = all_categories[t.id]
-                        
-                        if stopped:
-                            # Save checkpoint for later resume
+                            # Checkpoint this batch, full save every `save_every` batches
+                            append_ai_checkpoint(batch_cats)
                             st.session_state.ai_enrichment = {
                                 'categories': all_categories,
-                                'analyzed_ticket_ids': list(all_analyzed_ids),
+                                'analyzed_ticket_ids': all_analyzed_ids,
                                 'summary': existing_enrichment.get('summary', ''),
                                 'analyzed_count': len(all_analyzed_ids),
                                 'timestamp': datetime.now().isoformat(),
                                 'in_progress': True,
                             }
-                            save_to_cache()
-                            status.update(label=f"⏸️ Paused! {len(new_categories):,} tickets saved", state="complete")
-                            st.info("💡 Click '▶️ Resume' in sidebar to continue")
-                        else:
-                            # Generate summary
-                            st.write("📝 Generating summary...")
-                            progress.progress(0.98)
-                            summary = ai_service.generate_summary(tickets)
-                            
-                            # Save final results
-                            st.session_state.ai_enrichment = {
-                                'categories': all_categories,
-                                'analyzed_ticket_ids': list(all_analyzed_ids),
-                                'summary': summary,
-                                'analyzed_count': len(all_analyzed_ids),
-                                'timestamp': datetime.now().isoformat(),
-                                'in_progress': False,
-                            }
-                            save_to_cache()
-                            
-                            progress.progress(1.0)
-                            status.update(label=f"✅ Complete! Categorized {len(new_categories):,} tickets", state="complete")
+                            batches_since_save += 1
+                            if batches_since_save >= save_every:
+                                save_to_cache()
+                                batches_since_save = 0
                         
-                        st.rerun()
+                        # Apply categories to tickets
+                        _apply_categories(tickets, all_categories)
+                        
+                        # Generate summary
+                        st.write("📝 Generating summary...")
+                        progress.progress(0.98)
+                        summary = ai_service.generate_summary(tickets)
                         
+                        # Save final results
+                        st.session_state.ai_enrichment = {
+                            'categories': all_categories,
+                            'analyzed_ticket_ids': all_analyzed_ids,
+                            'summary': summary,
+                            'analyzed_count': len(all_analyzed_ids),
+                            'timestamp': datetime.now().isoformat(),
+                            'in_progress': False,
+                        }
+                        save_to_cache()
+                        
+                        progress.progress(1.0)
+                        status.update(label=f"✅ Complete! Categorized {len(new_categories):,} tickets", state="complete")
+                    
                 except Exception as e:
                     st.error(f"❌ Error: {e}")
         
@@ -335,49 +353,51 @@ def render_ai_page():
         
         # Show summary if available
         if ai_enrichment.get('summary'):
-            st.success(f"**🤖 AI Summary:** {ai_enrichment['summary']}")
-            st.caption(f"Analyzed {ai_enrichment.get('analyzed_count', 0)} tickets at {ai_enrichment.get('timestamp', 'unknown')[:16]}")
+            with summary_placeholder.container():
+                st.success(f"**🤖 AI Summary:** {ai_enrichment['summary']}")
+                st.caption(f"Analyzed {ai_enrichment.get('analyzed_count', 0)} tickets at {ai_enrichment.get('timestamp', 'unknown')[:16]}")
         
         clusters = ai_enrichment.get('clusters', [])
+        df = _ticket_frame(tickets)
         
         if not clusters:
             # Generate clusters based on categories
+            # Total/open/stale per category in one grouped pass
+            cluster_stats = (
+                df.groupby('category', sort=False)
+                .agg(total=('id', 'size'), open_count=('is_open', 'sum'), stale_count=('is_stale', 'sum'))
+                .sort_values('total', ascending=False, kind='stable')
+                .head(10)
+            )
             
-            # Simple clustering based on categories
-            category_clusters = defaultdict(list)
-            for t in tickets:
-                cat = t.category or 'Uncategorized'
-                category_clusters[cat].append(t)
+            # First 3 tickets of each displayed category (frame index = position in tickets)
+            samples = df[df['category'].isin(cluster_stats.index)].groupby('category', sort=False).head(3)
+            sample_rows = samples.groupby('category', sort=False).indices
             
             # Create cluster cards
             col1, col2 = st.columns(2)
             
-            for i, (cat_name, cat_tickets) in enumerate(sorted(
-                category_clusters.items(), 
-                key=lambda x: len(x[1]), 
-                reverse=True
-            )[:10]):
+            for i, row in enumerate(cluster_stats.itertuples()):
+                cat_name = row.Index
                 with col1 if i % 2 == 0 else col2:
-                    with st.expander(f"🏷️ {cat_name} ({len(cat_tickets)} tickets)", expanded=(i < 2)):
+                    with st.expander(f"🏷️ {cat_name} ({row.total} tickets)", expanded=(i < 2)):
                         # Cluster stats
-                        open_count = sum(1 for t in cat_tickets if t.is_open)
-                        stale_count = sum(1 for t in cat_tickets if t.is_open and t.days_open >= 15)
-                        
                         stat_cols = st.columns(3)
                         with stat_cols[0]:
-                            st.metric("Total", len(cat_tickets))
+                            st.metric("Total", int(row.total))
                         with stat_cols[1]:
-                            st.metric("Open", open_count)
+                            st.metric("Open", int(row.open_count))
                         with stat_cols[2]:
-                            st.metric("Stale", stale_count)
+                            st.metric("Stale", int(row.stale_count))
                         
                         # Sample tickets
                         st.markdown("**Sample Tickets:**")
-                        for t in cat_tickets[:3]:
+                        for j in sample_rows[cat_name]:
+                            t = tickets[samples.index[j]]
                             st.markdown(f"- `#{t.id}` {t.subject[:50]}...")
                         
-                        if len(cat_tickets) > 3:
-                            st.caption(f"+ {len(cat_tickets) - 3} more tickets")
+                        if row.total > 3:
+                            st.caption(f"+ {row.total - 3} more tickets")
         else:
             # Display AI-generated clusters
             for cluster in clusters:
@@ -390,22 +410,11 @@ def render_ai_page():
         st.markdown("---")
         st.subheader("📊 Cluster Distribution")
         
-        category_counts = Counter(t.category or 'Uncategorized' for t in tickets)
-        
-        fig = go.Figure(data=[go.Treemap(
-            labels=list(category_counts.keys()),
-            parents=[""] * len(category_counts),
-            values=list(category_counts.values()),
-            textinfo="label+value+percent parent",
-            marker=dict(
-                colors=list(category_counts.values()),
-                colorscale='Blues',
-            ),
-        )])
-        fig.update_layout(
-            height=400,
-            margin=dict(l=10, r=10, t=10, b=10),
-        )
+        # Categorical codes are C-level hashed; bincount gives counts in sorted label order
+        cats = pd.Categorical(df['category'])
+        counts = np.bincount(cats.codes, minlength=len(cats.categories))
+        
+        fig = _build_treemap(tuple(zip(cats.categories.tolist(), counts.tolist())))
         st.plotly_chart(fig, use_container_width=True)
     
     # =========================================================================
@@ -445,31 +454,21 @@ def render_ai_page():
             
             with col1:
                 st.markdown("##### Sentiment Distribution")
-                labels = [s.get('label', 'unknown') for s in sentiment_data.values()]
-                label_counts = Counter(labels)
-                
-                colors = {'positive': '#10B981', 'neutral': '#6B7280', 'negative': '#F59E0B', 
-                         'frustrated': '#EF4444', 'angry': '#DC2626'}
+                label_counts = Counter(s.get('label', 'unknown') for s in sentiment_data.values())
                 
-                fig = go.Figure(data=[go.Pie(
-                    labels=list(label_counts.keys()),
-                    values=list(label_counts.values()),
-                    marker_colors=[colors.get(l, '#6B7280') for l in label_counts.keys()],
-                    hole=0.4,
-                )])
-                fig.update_layout(height=300, margin=dict(l=20, r=20, t=20, b=20))
+                fig = _build_sentiment_pie(tuple(sorted(label_counts.items(), key=lambda kv: str(kv[0]))))
                 st.plotly_chart(fig, use_container_width=True)
             
             with col2:
                 st.markdown("##### Avg Sentiment Score")
-                scores = [s.get('score', 0) for s in sentiment_data.values()]
-                avg_score = sum(scores) / max(len(scores), 1)
+                avg_score = sum(s.get('score', 0) for s in sentiment_data.values()) / max(len(sentiment_data), 1)
                 
                 st.metric("Average", f"{avg_score:.2f}", delta=None)
                 
                 # Emotion breakdown
-                emotions = [s.get('emotion', 'unknown') for s in sentiment_data.values()]
-                emotion_counts = Counter(emotions).most_common(5)
+                emotion_counts = Counter(
+                    s.get('emotion', 'unknown') for s in sentiment_data.values()
+                ).most_common(5)
                 
                 st.markdown("**Top Emotions:**")
                 for emotion, count in emotion_counts:
@@ -655,68 +654,43 @@ def render_ai_page():
         
         col1, col2 = st.columns(2)
         
+        arrays = get_ticket_arrays(tickets)
+        cat_labels = arrays['cat_labels'].tolist()
+        cat_codes = arrays['cat_codes']
+        
         with col1:
             st.markdown("##### 📈 Category Trends")
             
-            # Weekly trend by category
-            weekly_cats = defaultdict(lambda: Counter())
-            for t in tickets:
-                if t.created_at:
-                    week = t.created_at.strftime('%Y-W%W')
-                    cat = t.category or 'Uncategorized'
-                    weekly_cats[week][cat] += 1
-            
-            weeks = sorted(weekly_cats.keys())[-8:]
-            top_cats = Counter(t.category or 'Uncategorized' for t in tickets).most_common(5)
-            
-            fig = go.Figure()
-            for cat_name, _ in top_cats:
-                fig.add_trace(go.Scatter(
-                    x=weeks,
-                    y=[weekly_cats[w].get(cat_name, 0) for w in weeks],
-                    name=cat_name[:20],
-                    mode='lines+markers',
-                ))
-            
-            fig.update_layout(
-                height=350,
-                xaxis_title="Week",
-                yaxis_title="Tickets",
-                legend=dict(orientation="h", yanchor="bottom", y=1.02),
-                margin=dict(l=20, r=20, t=40, b=20),
+            # Weekly trend by category: (week, category) counts pivoted in pandas
+            week_idx = arrays['week_idx']
+            dated = week_idx >= 0
+            top_codes = top_category_codes(arrays, 5).tolist()
+            weekly_cats = (
+                pd.DataFrame({'week': week_idx[dated], 'cat': cat_codes[dated]})
+                .groupby(['week', 'cat']).size()
+                .unstack(fill_value=0)
+                .iloc[-8:]
+                .reindex(columns=top_codes, fill_value=0)
             )
-            st.plotly_chart(fig, use_container_width=True)
+            weeks = tuple(format_week_key(k) for k in arrays['week_keys'][weekly_cats.index].tolist())
+            series = tuple((cat_labels[code], tuple(weekly_cats[code].tolist())) for code in top_codes)
+            
+            st.plotly_chart(_build_category_trend(weeks, series), use_container_width=True)
         
         with col2:
             st.markdown("##### ⏱️ Resolution by Category")
             
-            cat_resolution = defaultdict(list)
-            for t in tickets:
-                if t.resolution_time:
-                    cat = t.category or 'Uncategorized'
-                    cat_resolution[cat].append(t.resolution_time)
+            res = arrays['res']
+            resolved = (res != 0) & ~np.isnan(res)
+            res_sum = np.bincount(cat_codes[resolved], weights=res[resolved], minlength=len(cat_labels))
+            res_count = np.bincount(cat_codes[resolved], minlength=len(cat_labels))
             
-            cat_avg = {
-                cat: sum(times) / len(times)
-                for cat, times in cat_resolution.items()
-                if times
-            }
+            with_res = np.flatnonzero(res_count)
+            cat_avg = res_sum[with_res] / res_count[with_res]
+            top = with_res[np.argsort(-cat_avg, kind='stable')[:10]]
+            sorted_cats = tuple((cat_labels[c], float(res_sum[c] / res_count[c])) for c in top.tolist())
             
-            sorted_cats = sorted(cat_avg.items(), key=lambda x: x[1], reverse=True)[:10]
-            
-            fig = go.Figure(data=[go.Bar(
-                x=[c[1] for c in sorted_cats],
-                y=[c[0][:25] for c in sorted_cats],
-                orientation='h',
-                marker_color='#1F4E79',
-            )])
-            fig.update_layout(
-                height=350,
-                xaxis_title="Avg Resolution (hours)",
-                yaxis=dict(autorange="reversed"),
-                margin=dict(l=20, r=20, t=20, b=20),
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(_build_resolution_bar(sorted_cats), use_container_width=True)
         
         # Category keyword analysis
         st.markdown("---")
@@ -737,7 +711,7 @@ def render_ai_page():
         st.subheader("💡 AI Recommendations")
         st.caption("Actionable insights to improve support")
         
-        recommendations = generate_recommendations(tickets)
+        recommendations = generate_recommendations(tickets, get_ticket_arrays(tickets))
         
         for i, rec in enumerate(recommendations, 1):
             priority_color = {
@@ -758,63 +732,99 @@ def render_ai_page():
             st.markdown("---")
 
 
+# Keyword groups scanned by analyze_patterns (subject + description)
+PATTERN_KEYWORDS = {
+    'config': ['config', 'setup', 'setting', 'configure'],
+    'sync': ['sync', 'offline', 'connection', 'network', 'not connecting'],
+    'license': ['license', 'activation', 'key', 'subscription', 'expired'],
+}
+
+# Substring probes per group, built once at import. A keyword that contains
+# a shorter keyword of its own group ('configure' / 'config') can never
+# change the result, so it is dropped. `in` is CPython's fast substring
+# search and beats a compiled alternation regex on ticket-length text.
+PATTERN_PROBES = {
+    group: tuple(kw for kw in keywords if not any(other != kw and other in kw for other in keywords))
+    for group, keywords in PATTERN_KEYWORDS.items()
+}
+
+
 def analyze_patterns(tickets):
     """Analyze tickets for common patterns."""
     patterns = []
     
+    if not tickets:
+        return patterns
+    
+    # Single fused pass: per-pattern [count, resolution_sum] accumulators,
+    # no per-ticket match rows kept around
+    acc = {g: [0, 0.0] for g in (*PATTERN_KEYWORDS, 'slow')}
+    for t in tickets:
+        # No keyword contains a newline, so none can match across the join
+        text = t.search_text
+        rt = t.resolution_time or 0
+        for g, probes in PATTERN_PROBES.items():
+            if any(kw in text for kw in probes):
+                a = acc[g]
+                a[0] += 1
+                a[1] += rt
+        if rt > 200:
+            a = acc['slow']
+            a[0] += 1
+            a[1] += rt
+    
+    stats = {g: (count, total / count if count else 0.0) for g, (count, total) in acc.items()}
+    
     # Pattern 1: Configuration issues
-    config_keywords = ['config', 'setup', 'setting', 'configure']
-    config_tickets = [t for t in tickets if any(kw in t.subject.lower() or kw in t.description.lower() for kw in config_keywords)]
-    if config_tickets:
+    count, avg = stats['config']
+    if count:
         patterns.append({
             'name': 'Configuration Problems',
             'description': 'Tickets related to system configuration and setup',
             'impact': 'Users unable to properly configure the system',
             'fix': 'Create comprehensive configuration guides and wizards',
-            'count': len(config_tickets),
-            'severity': 'high' if len(config_tickets) > 20 else 'medium',
-            'avg_resolution': sum(t.resolution_time or 0 for t in config_tickets) / max(len(config_tickets), 1),
+            'count': count,
+            'severity': 'high' if count > 20 else 'medium',
+            'avg_resolution': avg,
         })
     
     # Pattern 2: Sync/Connection issues
-    sync_keywords = ['sync', 'offline', 'connection', 'network', 'not connecting']
-    sync_tickets = [t for t in tickets if any(kw in t.subject.lower() or kw in t.description.lower() for kw in sync_keywords)]
-    if sync_tickets:
+    count, avg = stats['sync']
+    if count:
         patterns.append({
             'name': 'Sync/Connection Issues',
             'description': 'Problems with data synchronization and connectivity',
             'impact': 'Data inconsistencies and workflow interruptions',
             'fix': 'Improve offline capabilities and connection resilience',
-            'count': len(sync_tickets),
-            'severity': 'high' if len(sync_tickets) > 15 else 'medium',
-            'avg_resolution': sum(t.resolution_time or 0 for t in sync_tickets) / max(len(sync_tickets), 1),
+            'count': count,
+            'severity': 'high' if count > 15 else 'medium',
+            'avg_resolution': avg,
         })
     
     # Pattern 3: License/Activation
-    license_keywords = ['license', 'activation', 'key', 'subscription', 'expired']
-    license_tickets = [t for t in tickets if any(kw in t.subject.lower() or kw in t.description.lower() for kw in license_keywords)]
-    if license_tickets:
+    count, avg = stats['license']
+    if count:
         patterns.append({
             'name': 'License/Activation Issues',
             'description': 'Problems with product licensing and activation',
             'impact': 'Users blocked from using the product',
             'fix': 'Streamline license delivery and self-service activation',
-            'count': len(license_tickets),
+            'count': count,
             'severity': 'high',
-            'avg_resolution': sum(t.resolution_time or 0 for t in license_tickets) / max(len(license_tickets), 1),
+            'avg_resolution': avg,
         })
     
     # Pattern 4: Long resolution times
-    slow_tickets = [t for t in tickets if t.resolution_time and t.resolution_time > 200]
-    if slow_tickets:
+    count, avg = stats['slow']
+    if count:
         patterns.append({
             'name': 'Slow Resolution Pattern',
-            'description': f'{len(slow_tickets)} tickets took over 200 hours to resolve',
+            'description': f'{count} tickets took over 200 hours to resolve',
             'impact': 'Customer frustration and potential churn',
             'fix': 'Identify and address bottlenecks in resolution process',
-            'count': len(slow_tickets),
+            'count': count,
             'severity': 'high',
-            'avg_resolution': sum(t.resolution_time or 0 for t in slow_tickets) / max(len(slow_tickets), 1),
+            'avg_resolution': avg,
         })
     
     return sorted(patterns, key=lambda x: x['count'], reverse=True)
@@ -825,16 +835,20 @@ def detect_anomalies(tickets):
     anomalies = []
     
     # Anomaly 1: Spike in ticket volume
-    daily_counts = Counter(t.created_at.strftime('%Y-%m-%d') for t in tickets if t.created_at)
-    if daily_counts:
-        avg_daily = sum(daily_counts.values()) / len(daily_counts)
-        for date, count in daily_counts.items():
-            if count > avg_daily * 3:
+    # Ticket ids per day, so a spike's tickets need no second scan
+    daily_ids = defaultdict(list)
+    for t in tickets:
+        if t.created_at:
+            daily_ids[t.day_key].append(t.id)
+    if daily_ids:
+        avg_daily = sum(len(ids) for ids in daily_ids.values()) / len(daily_ids)
+        for date, ids in daily_ids.items():
+            if len(ids) > avg_daily * 3:
                 anomalies.append({
                     'type': 'Volume Spike',
-                    'description': f'{date}: {count} tickets (3x average)',
+                    'description': f'{date}: {len(ids)} tickets (3x average)',
                     'severity': 'high',
-                    'tickets': [t.id for t in tickets if t.created_at and t.created_at.strftime('%Y-%m-%d') == date],
+                    'tickets': ids[:10],
                 })
     
     # Anomaly 2: Many high priority tickets
@@ -860,50 +874,66 @@ def detect_anomalies(tickets):
     return anomalies
 
 
-def generate_recommendations(tickets):
-    """Generate actionable recommendations."""
+def generate_recommendations(tickets, arrays):
+    """Generate actionable recommendations.
+    
+    `arrays` is get_ticket_arrays(tickets); its category counts are shared
+    with the Category Intelligence tab instead of being recounted here.
+    """
     recommendations = []
     
+    # All counters below in one pass, without materializing ticket lists
+    n_stale = n_no_response = n_with_response = n_breaches = 0
+    for t in tickets:
+        if t.is_open:
+            if t.days_open >= 15:
+                n_stale += 1
+            if not t.has_agent_response:
+                n_no_response += 1
+        if t.first_response_time is not None:
+            n_with_response += 1
+            if t.first_response_time > 12:
+                n_breaches += 1
+    
     # Rec 1: Stale tickets
-    stale = [t for t in tickets if t.is_open and t.days_open >= 15]
-    if stale:
+    if n_stale:
         recommendations.append({
-            'title': f'Address {len(stale)} Stale Tickets',
-            'description': f'There are {len(stale)} tickets that have been open for more than 15 days without resolution.',
+            'title': f'Address {n_stale} Stale Tickets',
+            'description': f'There are {n_stale} tickets that have been open for more than 15 days without resolution.',
             'action': 'Review and prioritize these tickets, escalate if needed, or close with resolution.',
             'impact': 'Improved customer satisfaction and reduced backlog.',
             'priority': 'high',
         })
     
     # Rec 2: No response tickets
-    no_response = [t for t in tickets if not t.has_agent_response and t.is_open]
-    if no_response:
+    if n_no_response:
         recommendations.append({
-            'title': f'Respond to {len(no_response)} Unanswered Tickets',
-            'description': f'{len(no_response)} open tickets have not received any agent response.',
+            'title': f'Respond to {n_no_response} Unanswered Tickets',
+            'description': f'{n_no_response} open tickets have not received any agent response.',
             'action': 'Assign and respond to these tickets immediately.',
             'impact': 'Prevent customer escalations and improve response metrics.',
             'priority': 'high',
         })
     
     # Rec 3: SLA improvement
-    with_response = [t for t in tickets if t.first_response_time is not None]
-    sla_breaches = [t for t in with_response if t.first_response_time > 12]
-    if len(sla_breaches) > len(with_response) * 0.2:
+    if n_breaches > n_with_response * 0.2:
         recommendations.append({
             'title': 'Improve First Response Time',
-            'description': f'{len(sla_breaches)} tickets ({len(sla_breaches)/len(with_response)*100:.0f}%) breached SLA.',
+            'description': f'{n_breaches} tickets ({n_breaches/n_with_response*100:.0f}%) breached SLA.',
             'action': 'Review workload distribution and consider adding resources during peak hours.',
             'impact': 'Higher SLA compliance and customer satisfaction.',
             'priority': 'medium',
         })
     
     # Rec 4: Knowledge base
-    common_issues = Counter(t.category for t in tickets if t.category).most_common(3)
+    common_issues = [
+        label for label in arrays['cat_labels'][top_category_codes(arrays, 4)].tolist()
+        if label != 'Uncategorized'
+    ][:3]
     if common_issues:
         recommendations.append({
             'title': 'Create Knowledge Base Articles',
-            'description': f'Top issues: {", ".join([c[0] for c in common_issues])} - consider self-service options.',
+            'description': f'Top issues: {", ".join(common_issues)} - consider self-service options.',
             'action': 'Create FAQ articles and troubleshooting guides for common issues.',
             'impact': 'Reduced ticket volume and faster resolution for simple issues.',
             'priority': 'medium',
@@ -912,6 +942,152 @@ def generate_recommendations(tickets):
     return recommendations
 
 
+def _request_stop():
+    """Stop button callback: flag the rerun it triggers to pause the analysis."""
+    st.session_state['_stop_flag'] = True
+
+
+def _unanalyzed_index(tickets, analyzed_ids) -> np.ndarray:
+    """Positions in `tickets` not yet AI-categorized.
+    
+    Memoized in session state and rebuilt only when the filtered ticket set
+    or the number of analyzed ids changes, not on every rerun.
+    """
+    stamp = (get_filter_signature(), len(analyzed_ids))
+    if st.session_state.get('_unanalyzed_stamp') != stamp:
+        ids = np.fromiter((t.id for t in tickets), dtype=np.int64, count=len(tickets))
+        done = np.fromiter(analyzed_ids, dtype=np.int64, count=len(analyzed_ids))
+        st.session_state['_unanalyzed_idx'] = np.flatnonzero(~np.isin(ids, done))
+        st.session_state['_unanalyzed_stamp'] = stamp
+    return st.session_state['_unanalyzed_idx']
+
+
+def _apply_categories(tickets, categories: dict):
+    """Set `t.category` from a ticket_id -> category map.
+    
+    Ids are resolved to positions with a vectorized searchsorted instead of
+    a dict probe per ticket; only the matched tickets are touched.
+    """
+    if not categories or not tickets:
+        return
+    ids = np.fromiter((t.id for t in tickets), dtype=np.int64, count=len(tickets))
+    order = np.argsort(ids, kind='stable')
+    sorted_ids = ids[order]
+    
+    keys = np.fromiter(categories.keys(), dtype=np.int64, count=len(categories))
+    values = np.array(list(categories.values()), dtype=object)
+    pos = np.minimum(np.searchsorted(sorted_ids, keys), len(sorted_ids) - 1)
+    found = sorted_ids[pos] == keys
+    
+    for i, cat in zip(order[pos[found]].tolist(), values[found]):
+        tickets[i].category = cat
+
+
+def _ticket_frame(tickets) -> pd.DataFrame:
+    """Flatten the ticket fields used by the cluster views into a DataFrame."""
+    df = pd.DataFrame({
+        'id': [t.id for t in tickets],
+        'category': [t.category or 'Uncategorized' for t in tickets],
+        'is_open': [t.is_open for t in tickets],
+        'days_open': [t.days_open for t in tickets],
+    })
+    df['is_stale'] = df['is_open'] & (df['days_open'] >= 15)
+    return df
+
+
+# =============================================================================
+# FIGURE BUILDERS
+# =============================================================================
+# Cached on the aggregated counts, so reruns that don't change the data
+# (tab clicks, Stop/Resume, sidebar widgets) skip figure construction.
+
+@st.cache_data(show_spinner=False)
+def _build_treemap(category_counts: tuple):
+    """Build the cluster distribution treemap from (category, count) pairs."""
+    import plotly.graph_objects as go
+    
+    labels = [c[0] for c in category_counts]
+    values = [c[1] for c in category_counts]
+    
+    fig = go.Figure(data=[go.Treemap(
+        labels=labels,
+        parents=[""] * len(labels),
+        values=values,
+        textinfo="label+value+percent parent",
+        marker=dict(
+            colors=values,
+            colorscale='Blues',
+        ),
+    )])
+    fig.update_layout(
+        height=400,
+        margin=dict(l=10, r=10, t=10, b=10),
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _build_category_trend(weeks: tuple, series: tuple):
+    """Build the weekly category trend lines from week labels and (category, counts) pairs."""
+    import plotly.graph_objects as go
+    
+    fig = go.Figure()
+    for cat_name, counts in series:
+        fig.add_trace(go.Scatter(
+            x=list(weeks),
+            y=list(counts),
+            name=cat_name[:20],
+            mode='lines+markers',
+        ))
+    
+    fig.update_layout(
+        height=350,
+        xaxis_title="Week",
+        yaxis_title="Tickets",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02),
+        margin=dict(l=20, r=20, t=40, b=20),
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _build_resolution_bar(category_avgs: tuple):
+    """Build the resolution-by-category bar chart from (category, avg hours) pairs."""
+    import plotly.graph_objects as go
+    
+    fig = go.Figure(data=[go.Bar(
+        x=[c[1] for c in category_avgs],
+        y=[c[0][:25] for c in category_avgs],
+        orientation='h',
+        marker_color='#1F4E79',
+    )])
+    fig.update_layout(
+        height=350,
+        xaxis_title="Avg Resolution (hours)",
+        yaxis=dict(autorange="reversed"),
+        margin=dict(l=20, r=20, t=20, b=20),
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _build_sentiment_pie(label_counts: tuple):
+    """Build the sentiment distribution donut from (label, count) pairs."""
+    import plotly.graph_objects as go
+    
+    colors = {'positive': '#10B981', 'neutral': '#6B7280', 'negative': '#F59E0B', 
+             'frustrated': '#EF4444', 'angry': '#DC2626'}
+    
+    fig = go.Figure(data=[go.Pie(
+        labels=[l[0] for l in label_counts],
+        values=[l[1] for l in label_counts],
+        marker_colors=[colors.get(l[0], '#6B7280') for l in label_counts],
+        hole=0.4,
+    )])
+    fig.update_layout(height=300, margin=dict(l=20, r=20, t=20, b=20))
+    return fig
+
+
 # =============================================================================
 # MAIN
 # =============================================================================
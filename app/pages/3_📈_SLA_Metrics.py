@@ -5,19 +5,26 @@ Comprehensive SLA performance tracking and analysis.
 """
 
 import streamlit as st
-import plotly.express as px
 import plotly.graph_objects as go
+import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
-from collections import Counter, defaultdict
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from core.session_state import init_session_state, apply_filters
+from core.session_state import init_session_state, apply_filters, get_ticket_arrays, format_week_key
 from core.config_manager import get_config
 from core.ui_components import inject_beta_badge
 
+# Try optional imports
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 # Page config
 st.set_page_config(page_title="SLA Metrics | FTEX", page_icon="📈", layout="wide")
 
@@ -52,18 +59,29 @@ def render_sla_page():
     frt_target = sla_config.get('first_response_hours', 12)
     resolution_target = sla_config.get('resolution_hours', 24)
     
-    # Calculate metrics
-    with_response = [t for t in tickets if t.first_response_time is not None]
-    resolved = [t for t in tickets if t.resolution_time is not None]
+    # Calculate metrics on the struct-of-arrays view (NaN = not responded/resolved)
+    arrays = get_ticket_arrays(tickets)
+    frt = arrays['frt']
+    res = arrays['res']
+    has_response = ~np.isnan(frt)
+    frt_ok = frt <= frt_target  # NaN compares False
+    
+    # Per-priority first response targets, indexed by priority code
+    priority_sla = sla_config.get('by_priority', {})
+    priority_targets = np.full(5, float(frt_target))
+    for priority_code, priority_name in PRIORITY_LEVELS:
+        priority_targets[priority_code] = priority_sla.get(priority_name, {}).get('first_response', frt_target)
     
-    frt_met = sum(1 for t in with_response if t.first_response_time <= frt_target)
-    frt_rate = (frt_met / len(with_response) * 100) if with_response else 0
+    (n_response, frt_met, frt_sum, n_resolved, res_met, res_sum,
+     pri_count, pri_met, pri_sum) = _sla_stats(
+        frt, res, arrays['priority'], float(frt_target), float(resolution_target), priority_targets,
+    )
     
-    res_met = sum(1 for t in resolved if t.resolution_time <= resolution_target)
-    res_rate = (res_met / len(resolved) * 100) if resolved else 0
+    frt_rate = (frt_met / n_response * 100) if n_response else 0
+    res_rate = (res_met / n_resolved * 100) if n_resolved else 0
     
-    avg_frt = sum(t.first_response_time for t in with_response) / len(with_response) if with_response else 0
-    avg_resolution = sum(t.resolution_time for t in resolved) / len(resolved) if resolved else 0
+    avg_frt = frt_sum / n_response if n_response else 0
+    avg_resolution = res_sum / n_resolved if n_resolved else 0
     
     # =========================================================================
     # KPI ROW
@@ -111,69 +129,23 @@ def render_sla_page():
         st.subheader("⏱️ First Response Time SLA")
         
         # Gauge chart
-        fig = go.Figure(go.Indicator(
-            mode="gauge+number+delta",
-            value=frt_rate,
-            domain={'x': [0, 1], 'y': [0, 1]},
-            title={'text': f"Target: <{frt_target}h"},
-            delta={'reference': 90, 'increasing': {'color': "green"}},
-            gauge={
-                'axis': {'range': [0, 100]},
-                'bar': {'color': "#1F4E79"},
-                'steps': [
-                    {'range': [0, 70], 'color': "#FEE2E2"},
-                    {'range': [70, 80], 'color': "#FEF3C7"},
-                    {'range': [80, 90], 'color': "#FEF9C3"},
-                    {'range': [90, 100], 'color': "#D1FAE5"},
-                ],
-                'threshold': {
-                    'line': {'color': "red", 'width': 4},
-                    'thickness': 0.75,
-                    'value': 90
-                }
-            }
-        ))
-        fig.update_layout(height=300, margin=dict(l=20, r=20, t=50, b=20))
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(_build_sla_gauge(frt_rate, f"Target: <{frt_target}h"), use_container_width=True)
         
         # Stats
         st.markdown(f"""
         - **Met SLA**: {frt_met:,} tickets ({frt_rate:.1f}%)
-        - **Breached SLA**: {len(with_response) - frt_met:,} tickets
+        - **Breached SLA**: {n_response - frt_met:,} tickets
         - **Average**: {avg_frt:.1f} hours
         """)
     
     with col2:
         st.subheader("✅ Resolution Time SLA")
         
-        fig = go.Figure(go.Indicator(
-            mode="gauge+number+delta",
-            value=res_rate,
-            domain={'x': [0, 1], 'y': [0, 1]},
-            title={'text': f"Target: <{resolution_target}h"},
-            delta={'reference': 90, 'increasing': {'color': "green"}},
-            gauge={
-                'axis': {'range': [0, 100]},
-                'bar': {'color': "#1F4E79"},
-                'steps': [
-                    {'range': [0, 70], 'color': "#FEE2E2"},
-                    {'range': [70, 80], 'color': "#FEF3C7"},
-                    {'range': [80, 90], 'color': "#FEF9C3"},
-                    {'range': [90, 100], 'color': "#D1FAE5"},
-                ],
-                'threshold': {
-                    'line': {'color': "red", 'width': 4},
-                    'thickness': 0.75,
-                    'value': 90
-                }
-            }
-        ))
-        fig.update_layout(height=300, margin=dict(l=20, r=20, t=50, b=20))
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(_build_sla_gauge(res_rate, f"Target: <{resolution_target}h"), use_container_width=True)
         
         st.markdown(f"""
         - **Met SLA**: {res_met:,} tickets ({res_rate:.1f}%)
-        - **Breached SLA**: {len(resolved) - res_met:,} tickets
+        - **Breached SLA**: {n_resolved - res_met:,} tickets
         - **Average**: {avg_resolution:.1f} hours
         """)
     
@@ -184,38 +156,16 @@ def render_sla_page():
     st.subheader("📊 SLA Performance Over Time")
     
     # Group by week
-    weekly_data = defaultdict(lambda: {'total': 0, 'met': 0})
+    week_keys, week_idx = arrays['week_keys'], arrays['week_idx']
+    in_week = has_response & (week_idx >= 0)
+    week_total = np.bincount(week_idx[in_week], minlength=len(week_keys))
+    week_met = np.bincount(week_idx[in_week], weights=frt_ok[in_week], minlength=len(week_keys))
     
-    for t in with_response:
-        if t.created_at:
-            week = t.created_at.strftime('%Y-W%W')
-            weekly_data[week]['total'] += 1
-            if t.first_response_time <= frt_target:
-                weekly_data[week]['met'] += 1
+    recent = np.flatnonzero(week_total)[-12:]  # Last 12 weeks with responses
+    weeks = tuple(format_week_key(k) for k in week_keys[recent].tolist())
+    rates = tuple((week_met[recent] / week_total[recent] * 100).tolist())
     
-    weeks = sorted(weekly_data.keys())[-12:]  # Last 12 weeks
-    rates = [
-        (weekly_data[w]['met'] / weekly_data[w]['total'] * 100) if weekly_data[w]['total'] > 0 else 0
-        for w in weeks
-    ]
-    
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=weeks, y=rates,
-        mode='lines+markers',
-        name='SLA Rate',
-        line=dict(color='#1F4E79', width=3),
-        marker=dict(size=8),
-    ))
-    fig.add_hline(y=90, line_dash="dash", line_color="red", annotation_text="Target (90%)")
-    fig.update_layout(
-        height=350,
-        xaxis_title="Week",
-        yaxis_title="SLA Compliance %",
-        yaxis_range=[0, 100],
-        margin=dict(l=20, r=20, t=20, b=20),
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(_build_sla_trend(weeks, rates), use_container_width=True)
     
     # =========================================================================
     # SLA BY PRIORITY
@@ -223,28 +173,19 @@ def render_sla_page():
     st.markdown("---")
     st.subheader("⚡ SLA by Priority")
     
-    priority_sla = sla_config.get('by_priority', {})
-    
-    priority_data = []
-    for priority_name in ['Urgent', 'High', 'Medium', 'Low']:
-        priority_tickets = [t for t in with_response if t.priority_name == priority_name]
-        if priority_tickets:
-            target = priority_sla.get(priority_name, {}).get('first_response', frt_target)
-            met = sum(1 for t in priority_tickets if t.first_response_time <= target)
-            rate = met / len(priority_tickets) * 100
-            avg = sum(t.first_response_time for t in priority_tickets) / len(priority_tickets)
-            priority_data.append({
-                'Priority': priority_name,
-                'Tickets': len(priority_tickets),
-                'Target (hrs)': target,
-                'Met SLA': met,
-                'SLA %': f"{rate:.1f}%",
-                'Avg Response (hrs)': f"{avg:.1f}",
-            })
-    
-    if priority_data:
-        import pandas as pd
-        df = pd.DataFrame(priority_data)
+    levels = [(code, name) for code, name in PRIORITY_LEVELS if pri_count[code]]
+    
+    if levels:
+        codes = np.array([code for code, _ in levels])
+        counts = pri_count[codes]
+        df = pd.DataFrame({
+            'Priority': [name for _, name in levels],
+            'Tickets': counts,
+            'Target (hrs)': [priority_sla.get(name, {}).get('first_response', frt_target) for _, name in levels],
+            'Met SLA': pri_met[codes],
+            'SLA %': [f"{rate:.1f}%" for rate in (pri_met[codes] / counts * 100).tolist()],
+            'Avg Response (hrs)': [f"{avg:.1f}" for avg in (pri_sum[codes] / counts).tolist()],
+        })
         st.dataframe(df, use_container_width=True, hide_index=True)
     
     # =========================================================================
@@ -253,38 +194,37 @@ def render_sla_page():
     st.markdown("---")
     st.subheader("⚠️ Recent SLA Breaches")
     
-    breaches = [t for t in with_response if t.first_response_time > frt_target]
-    breaches = sorted(breaches, key=lambda t: t.first_response_time, reverse=True)[:20]
+    # Worst 20 by response time (stable, so ties keep ticket order). Partition
+    # down to the top 20 first - keeping anything tied with the 20th value -
+    # so only those few get sorted, not every breach.
+    breach_idx = np.flatnonzero(frt > frt_target)
+    if breach_idx.size > 20:
+        cutoff = np.partition(frt[breach_idx], -20)[-20]
+        breach_idx = breach_idx[frt[breach_idx] >= cutoff]
+    breach_idx = breach_idx[np.argsort(-frt[breach_idx], kind='stable')[:20]]
+    breaches = [tickets[i] for i in breach_idx.tolist()]
     
     if breaches:
-        breach_data = []
-        for t in breaches:
-            breach_data.append({
-                'Ticket ID': t.id,
-                'Subject': t.subject[:40],
-                'Company': t.company_name[:25] if t.company_name else '-',
-                'Priority': t.priority_name,
-                'Response Time (hrs)': f"{t.first_response_time:.1f}",
-                'Target (hrs)': frt_target,
-                'Breach (hrs)': f"{t.first_response_time - frt_target:.1f}",
-            })
+        breach_frt = frt[breach_idx].tolist()
+        df = pd.DataFrame({
+            'Ticket ID': arrays['id'][breach_idx],
+            'Subject': [t.subject[:40] for t in breaches],
+            'Company': [t.company_name[:25] if t.company_name else '-' for t in breaches],
+            'Priority': [t.priority_name for t in breaches],
+            'Response Time (hrs)': [f"{h:.1f}" for h in breach_frt],
+            'Target (hrs)': frt_target,
+            'Breach (hrs)': [f"{h - frt_target:.1f}" for h in breach_frt],
+        })
         
-        import pandas as pd
-        df = pd.DataFrame(breach_data)
-        
-        # Color the breach column
-        def highlight_breach(val):
-            try:
-                hours = float(val)
-                if hours > 24:
-                    return 'background-color: #FEE2E2'
-                elif hours > 12:
-                    return 'background-color: #FEF3C7'
-                return ''
-            except:
-                return ''
+        # Color the breach column: one vectorized pass over the displayed values
+        breach_hours = df['Breach (hrs)'].astype(float).to_numpy()
+        breach_colors = np.select(
+            [breach_hours > 24, breach_hours > 12],
+            ['background-color: #FEE2E2', 'background-color: #FEF3C7'],
+            default='',
+        )
         
-        styled_df = df.style.applymap(highlight_breach, subset=['Breach (hrs)'])
+        styled_df = df.style.apply(lambda _: breach_colors, subset=['Breach (hrs)'])
         st.dataframe(styled_df, use_container_width=True, hide_index=True)
     else:
         st.success("✅ No SLA breaches found!")
@@ -297,15 +237,6 @@ def render_sla_page():
     
     bands = sla_config.get('bands', {})
     
-    # Categorize tickets by band
-    band_counts = Counter()
-    for t in with_response:
-        rate = 100 if t.first_response_time <= frt_target else 0
-        for band_name, band_config in bands.items():
-            if band_config['min'] <= rate <= band_config['max']:
-                band_counts[band_name] += 1
-                break
-    
     # Display band summary
     col1, col2, col3, col4, col5 = st.columns(5)
     band_cols = [col1, col2, col3, col4, col5]
@@ -321,6 +252,157 @@ def render_sla_page():
                 st.markdown(f"{band['min']}-{band['max']}%")
 
 
+# =============================================================================
+# FIGURE BUILDERS
+# =============================================================================
+# Cached on the aggregated values, so reruns that don't change the data
+# skip figure construction.
+
+# Shared gauge styling: red/amber/yellow/green bands with a 90% target line
+GAUGE_STEPS = [
+    {'range': [0, 70], 'color': "#FEE2E2"},
+    {'range': [70, 80], 'color': "#FEF3C7"},
+    {'range': [80, 90], 'color': "#FEF9C3"},
+    {'range': [90, 100], 'color': "#D1FAE5"},
+]
+GAUGE_THRESHOLD = {
+    'line': {'color': "red", 'width': 4},
+    'thickness': 0.75,
+    'value': 90
+}
+
+
+@st.cache_data(show_spinner=False)
+def _build_sla_gauge(value: float, title: str) -> go.Figure:
+    """Build an SLA compliance gauge for a rate in percent."""
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number+delta",
+        value=value,
+        domain={'x': [0, 1], 'y': [0, 1]},
+        title={'text': title},
+        delta={'reference': 90, 'increasing': {'color': "green"}},
+        gauge={
+            'axis': {'range': [0, 100]},
+            'bar': {'color': "#1F4E79"},
+            'steps': GAUGE_STEPS,
+            'threshold': GAUGE_THRESHOLD,
+        }
+    ))
+    fig.update_layout(height=300, margin=dict(l=20, r=20, t=50, b=20))
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _build_sla_trend(weeks: tuple, rates: tuple) -> go.Figure:
+    """Build the weekly first response SLA compliance line chart."""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=list(weeks), y=list(rates),
+        mode='lines+markers',
+        name='SLA Rate',
+        line=dict(color='#1F4E79', width=3),
+        marker=dict(size=8),
+    ))
+    fig.add_hline(y=90, line_dash="dash", line_color="red", annotation_text="Target (90%)")
+    fig.update_layout(
+        height=350,
+        xaxis_title="Week",
+        yaxis_title="SLA Compliance %",
+        yaxis_range=[0, 100],
+        margin=dict(l=20, r=20, t=20, b=20),
+    )
+    return fig
+
+
+# =============================================================================
+# SLA STATS
+# =============================================================================
+
+# (priority code, name) in display order
+PRIORITY_LEVELS = [(4, 'Urgent'), (3, 'High'), (2, 'Medium'), (1, 'Low')]
+
+
+def _sla_stats(frt, res, priority, frt_target, res_target, priority_targets):
+    """KPI and per-priority SLA counts over the ticket arrays.
+    
+    NaN in `frt`/`res` means no response/resolution. Returns
+    (n_response, frt_met, frt_sum, n_resolved, res_met, res_sum,
+    pri_count, pri_met, pri_sum), the last three indexed by priority code.
+    Uses a fused numba kernel when numba is installed.
+    """
+    if NUMBA_AVAILABLE:
+        return _sla_kernel(frt, res, priority, frt_target, res_target, priority_targets)
+    
+    has_response = ~np.isnan(frt)
+    has_resolution = ~np.isnan(res)
+    
+    # Priority buckets: sort responded tickets by priority once, find bucket
+    # boundaries with searchsorted and reduce each contiguous run
+    k = priority_targets.size
+    pri = priority[has_response]
+    in_range = (pri >= 0) & (pri < k)
+    order = np.argsort(pri[in_range], kind='stable')
+    sorted_pri = pri[in_range][order]
+    sorted_frt = frt[has_response][in_range][order]
+    
+    bounds = np.searchsorted(sorted_pri, np.arange(k + 1))
+    pri_count = np.diff(bounds)
+    pri_met = np.zeros(k, dtype=np.int64)
+    pri_sum = np.zeros(k, dtype=np.float64)
+    nonempty = pri_count > 0
+    if nonempty.any():
+        # reduceat misreads empty runs, so reduce over the non-empty starts only
+        starts = bounds[:-1][nonempty]
+        met = (sorted_frt <= priority_targets[sorted_pri]).astype(np.int64)
+        pri_met[nonempty] = np.add.reduceat(met, starts)
+        pri_sum[nonempty] = np.add.reduceat(sorted_frt, starts)
+    
+    return (
+        int(has_response.sum()), int((frt <= frt_target).sum()), float(frt[has_response].sum()),
+        int(has_resolution.sum()), int((res <= res_target).sum()), float(res[has_resolution].sum()),
+        pri_count, pri_met, pri_sum,
+    )
+
+
+if NUMBA_AVAILABLE:
+    # No fastmath: it would let the compiler assume away the NaN checks
+    @njit(cache=True)
+    def _sla_kernel(frt, res, priority, frt_target, res_target, priority_targets):
+        """Single fused pass computing everything _sla_stats() returns."""
+        k = priority_targets.size
+        pri_count = np.zeros(k, dtype=np.int64)
+        pri_met = np.zeros(k, dtype=np.int64)
+        pri_sum = np.zeros(k, dtype=np.float64)
+        n_response = 0
+        frt_met = 0
+        frt_sum = 0.0
+        n_resolved = 0
+        res_met = 0
+        res_sum = 0.0
+        
+        for i in range(frt.size):
+            f = frt[i]
+            if not np.isnan(f):
+                n_response += 1
+                frt_sum += f
+                if f <= frt_target:
+                    frt_met += 1
+                p = priority[i]
+                if 0 <= p < k:
+                    pri_count[p] += 1
+                    pri_sum[p] += f
+                    if f <= priority_targets[p]:
+                        pri_met[p] += 1
+            r = res[i]
+            if not np.isnan(r):
+                n_resolved += 1
+                res_sum += r
+                if r <= res_target:
+                    res_met += 1
+        
+        return n_response, frt_met, frt_sum, n_resolved, res_met, res_sum, pri_count, pri_met, pri_sum
+
+
 # =============================================================================
 # MAIN
 # =============================================================================
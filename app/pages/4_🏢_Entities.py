@@ -8,13 +8,22 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
-from collections import Counter, defaultdict
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from core.session_state import init_session_state, apply_filters
+from core.session_state import (
+    init_session_state,
+    apply_filters,
+    get_filter_signature,
+    get_ticket_arrays,
+    days_open,
+    format_week_key,
+)
 from core.config_manager import get_config
 from core.ui_components import inject_beta_badge
 
@@ -28,6 +37,21 @@ inject_beta_badge()
 init_session_state()
 config = get_config()
 
+NEGATIVE_SENTIMENTS = frozenset({'frustrated', 'angry', 'negative'})
+
+# Health bands: score thresholds (ascending) and the label for each band,
+# lowest first, so np.digitize(score, HEALTH_THRESHOLDS) indexes the label
+HEALTH_THRESHOLDS = np.array([40, 60, 80])
+HEALTH_LABELS = np.array(['🔴 Critical', '🟠 Needs Attention', '🟡 Fair', '🟢 Good'], dtype=object)
+
+# Table cell background per health band, aligned with HEALTH_LABELS
+HEALTH_BACKGROUNDS = np.array([
+    'background-color: #FEE2E2',
+    'background-color: #FFEDD5',
+    'background-color: #FEF3C7',
+    'background-color: #D1FAE5',
+], dtype=object)
+
 
 def render_entities_page():
     """Render the entities page."""
@@ -53,12 +77,16 @@ def render_entities_page():
         return
     
     # Analyze by entity
-    entity_data = analyze_entities(tickets, entity_type)
+    arrays = get_ticket_arrays(tickets)
+    entity_data = get_entity_data(arrays, entity_type)
     
     if not entity_data:
         st.info(f"No {entity_label.lower()} data available.")
         return
     
+    # Rank once by volume; every tab slices this order
+    by_tickets = entity_data.ranked('tickets')
+    
     # =========================================================================
     # SUMMARY KPIs
     # =========================================================================
@@ -74,30 +102,30 @@ def render_entities_page():
         st.metric(f"Total {entity_plural}", len(entity_data))
     
     with col2:
-        active = sum(1 for d in entity_data.values() if d['open'] > 0)
+        active = int((entity_data.open > 0).sum())
         st.metric("With Open Tickets", active)
     
     with col3:
-        at_risk = sum(1 for d in entity_data.values() if d['stale'] > 0)
+        at_risk = int((entity_data.stale > 0).sum())
         st.metric("At Risk", at_risk)
     
     with col4:
-        total_tickets = sum(d['tickets'] for d in entity_data.values())
-        avg = total_tickets / len(entity_data) if entity_data else 0
+        avg = entity_data.tickets.sum() / len(entity_data)
         st.metric("Avg Tickets", f"{avg:.1f}")
     
     with col5:
         # AI Churn Risk (if deep analysis available)
         if sentiment_data:
             # Calculate churn risk based on sentiment
-            churn_high = 0
-            for name, data in entity_data.items():
-                entity_tickets = [t for t in tickets if (t.entity_name or t.company_name) == name]
-                negative = sum(1 for t in entity_tickets 
-                             if t.id in sentiment_data and 
-                             sentiment_data[t.id].get('label') in ['frustrated', 'angry', 'negative'])
-                if negative >= 2 or (data['stale'] >= 2 and data['open'] >= 3):
-                    churn_high += 1
+            negative_ids = [
+                tid for tid, sentiment in sentiment_data.items()
+                if sentiment.get('label') in NEGATIVE_SENTIMENTS
+            ]
+            negative = np.isin(arrays['id'], negative_ids)
+            negative_counts = np.bincount(entity_data.ticket_slot[negative], minlength=len(entity_data))
+            churn_high = int((
+                (negative_counts >= 2) | ((entity_data.stale >= 2) & (entity_data.open >= 3))
+            ).sum())
             st.metric("🔥 Churn Risk", churn_high, delta="AI detected", delta_color="inverse" if churn_high > 0 else "normal")
         else:
             st.metric("Churn Risk", "N/A", delta="Run AI Analysis")
@@ -118,79 +146,52 @@ def render_entities_page():
         with col1:
             st.subheader(f"📊 {entity_plural} by Ticket Volume")
             
-            top_entities = sorted(entity_data.items(), key=lambda x: x[1]['tickets'], reverse=True)[:15]
-            
-            fig = go.Figure(data=[go.Bar(
-                x=[e[1]['tickets'] for e in top_entities],
-                y=[e[0][:25] for e in top_entities],
-                orientation='h',
-                marker_color='#1F4E79',
-            )])
-            fig.update_layout(
-                height=400,
-                xaxis_title="Tickets",
-                yaxis=dict(autorange="reversed"),
-                margin=dict(l=20, r=20, t=20, b=20),
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            top_15 = by_tickets[:15]
+            fig = _build_volume_bar(tuple(zip(entity_data.names[top_15].tolist(), entity_data.tickets[top_15].tolist())))
+            st.plotly_chart(fig, use_container_width=True, key="entities_volume_bar")
         
         with col2:
             st.subheader(f"🎯 {entity_label} Health Distribution")
             
-            health_counts = Counter(d['health'] for d in entity_data.values())
-            
-            colors = {
-                '🟢 Good': '#10B981',
-                '🟡 Fair': '#F59E0B',
-                '🟠 Needs Attention': '#F97316',
-                '🔴 Critical': '#EF4444',
-            }
+            # Healthiest band first; empty bands are left out of the donut
+            band_counts = np.bincount(entity_data.health_code, minlength=len(HEALTH_LABELS))[::-1]
+            bands = HEALTH_LABELS[::-1]
+            present = band_counts > 0
             
-            fig = go.Figure(data=[go.Pie(
-                labels=list(health_counts.keys()),
-                values=list(health_counts.values()),
-                hole=0.4,
-                marker=dict(colors=[colors.get(h, '#6B7280') for h in health_counts.keys()]),
-            )])
-            fig.update_layout(
-                height=400,
-                margin=dict(l=20, r=20, t=20, b=20),
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            fig = _build_health_pie(tuple(zip(bands[present].tolist(), band_counts[present].tolist())))
+            st.plotly_chart(fig, use_container_width=True, key="entities_health_pie")
         
         # Entity table
         st.subheader(f"📋 All {entity_plural}")
         
-        import pandas as pd
-        
-        table_data = []
-        for name, data in sorted(entity_data.items(), key=lambda x: x[1]['tickets'], reverse=True):
-            table_data.append({
-                entity_label: name[:35],
-                'Tickets': data['tickets'],
-                'Open': data['open'],
-                'Stale': data['stale'],
-                'High Priority': data['high_priority'],
-                'Avg Resolution (hrs)': data['avg_resolution'],
-                'Health': data['health'],
-            })
-        
-        df = pd.DataFrame(table_data)
+        df = pd.DataFrame({
+            entity_label: entity_data.display_names[by_tickets],
+            'Tickets': entity_data.tickets[by_tickets],
+            'Open': entity_data.open[by_tickets],
+            'Stale': entity_data.stale[by_tickets],
+            'High Priority': entity_data.high_priority[by_tickets],
+            'Avg Resolution (hrs)': entity_data.avg_resolution[by_tickets],
+            'Health': entity_data.health[by_tickets],
+        })
         
-        # Style
-        def style_health(val):
-            if '🟢' in val:
-                return 'background-color: #D1FAE5'
-            elif '🟡' in val:
-                return 'background-color: #FEF3C7'
-            elif '🟠' in val:
-                return 'background-color: #FFEDD5'
-            elif '🔴' in val:
-                return 'background-color: #FEE2E2'
-            return ''
+        # Color the health column straight from the band codes, no per-cell callback
+        health_css = HEALTH_BACKGROUNDS[entity_data.health_code[by_tickets]]
         
-        styled_df = df.style.applymap(style_health, subset=['Health'])
-        st.dataframe(styled_df, use_container_width=True, hide_index=True)
+        styled_df = (
+            df.style
+            .apply(lambda _: health_css, subset=['Health'])
+            .format({'Avg Resolution (hrs)': '{:.1f}'})
+        )
+        st.dataframe(
+            styled_df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'Health': st.column_config.TextColumn(
+                    help="Score from stale tickets, high priority load and open ratio",
+                ),
+            },
+        )
     
     # =========================================================================
     # TAB 2: TOP ENTITIES
@@ -198,7 +199,7 @@ def render_entities_page():
     with tabs[1]:
         st.subheader(f"🏆 Top {entity_plural} by Volume")
         
-        top_10 = sorted(entity_data.items(), key=lambda x: x[1]['tickets'], reverse=True)[:10]
+        top_10 = entity_data.rows(by_tickets[:10])
         
         for i, (name, data) in enumerate(top_10, 1):
             medal = {1: '🥇', 2: '🥈', 3: '🥉'}.get(i, f'{i}.')
@@ -216,9 +217,9 @@ def render_entities_page():
                     st.metric("Health", data['health'])
                 
                 # Categories breakdown
-                if data.get('categories'):
+                if data['top_categories']:
                     st.markdown("**Top Categories:**")
-                    for cat, count in data['categories'].most_common(3):
+                    for cat, count in data['top_categories']:
                         st.markdown(f"- {cat}: {count}")
     
     # =========================================================================
@@ -228,14 +229,14 @@ def render_entities_page():
         st.subheader(f"⚠️ At-Risk {entity_plural}")
         st.caption(f"{entity_plural} with stale tickets or low health scores")
         
-        at_risk_entities = [
-            (name, data) for name, data in entity_data.items()
-            if data['stale'] > 0 or '🔴' in data['health'] or '🟠' in data['health']
-        ]
-        at_risk_entities.sort(key=lambda x: x[1]['stale'], reverse=True)
+        at_risk_mask = (
+            (entity_data.stale > 0)
+            | (entity_data.health == '🔴 Critical')
+            | (entity_data.health == '🟠 Needs Attention')
+        )
         
-        if at_risk_entities:
-            for name, data in at_risk_entities[:20]:
+        if at_risk_mask.any():
+            for name, data in entity_data.rows(entity_data.ranked('stale', 20, mask=at_risk_mask)):
                 severity = '🔴' if data['stale'] >= 3 or '🔴' in data['health'] else '🟠'
                 
                 with st.expander(f"{severity} {name} - {data['stale']} stale, {data['open']} open"):
@@ -262,106 +263,263 @@ def render_entities_page():
         st.subheader(f"📈 {entity_label} Ticket Trends")
         
         # Weekly trend for top entities
-        top_5 = sorted(entity_data.items(), key=lambda x: x[1]['tickets'], reverse=True)[:5]
-        
-        # Build weekly data
-        weekly_data = defaultdict(lambda: defaultdict(int))
-        for t in tickets:
-            if t.created_at:
-                entity = t.entity_name or t.company_name or '(Unknown)'
-                week = t.created_at.strftime('%Y-W%W')
-                weekly_data[entity][week] += 1
-        
-        # Get all weeks
-        all_weeks = sorted(set(
-            t.created_at.strftime('%Y-W%W') 
-            for t in tickets if t.created_at
-        ))[-12:]  # Last 12 weeks
-        
-        fig = go.Figure()
+        weeks, series = get_entity_trend(arrays, entity_data, by_tickets[:5])
+        fig = _build_entity_trend(weeks, series)
+        st.plotly_chart(fig, use_container_width=True, key="entities_trend")
+
+
+def get_entity_data(arrays, entity_type):
+    """Per-entity aggregates for the filtered tickets.
+    
+    Memoized in session state on the filter signature, the entity type and
+    the AI enrichment timestamp (AI runs rewrite ticket categories), so tab
+    switches and other reruns reuse the aggregation instead of redoing it.
+    """
+    stamp = (
+        get_filter_signature(),
+        entity_type,
+        st.session_state.get('ai_enrichment', {}).get('timestamp'),
+    )
+    if st.session_state.get('_entity_data_stamp') != stamp:
+        st.session_state['_entity_data'] = analyze_entities(arrays, entity_type)
+        st.session_state['_entity_data_stamp'] = stamp
+    return st.session_state['_entity_data']
+
+
+def get_entity_trend(arrays, entity_data, slots):
+    """Weekly ticket counts for the entities in `slots` over the last 12 weeks.
+    
+    Returns (week labels, ((name, counts), ...)) ready for the trend
+    builder. Memoized next to get_entity_data() on the same stamp, so a
+    rerun that doesn't change the aggregates skips the bucketing.
+    """
+    stamp = st.session_state.get('_entity_data_stamp')
+    if st.session_state.get('_entity_trend_stamp') != stamp:
+        week_keys, week_idx = arrays['week_keys'], arrays['week_idx']
+        first = max(len(week_keys) - 12, 0)
+        n_weeks = len(week_keys) - first
         
-        for name, _ in top_5:
-            fig.add_trace(go.Scatter(
-                x=all_weeks,
-                y=[weekly_data[name].get(w, 0) for w in all_weeks],
-                name=name[:20],
-                mode='lines+markers',
-            ))
+        # Only tickets of the plotted entities in the plotted weeks are bucketed
+        rank = np.full(len(entity_data), -1)
+        rank[slots] = np.arange(len(slots))
+        ticket_rank = rank[entity_data.ticket_slot]
+        keep = (ticket_rank >= 0) & (week_idx >= first)
+        counts = np.bincount(
+            ticket_rank[keep] * n_weeks + (week_idx[keep] - first),
+            minlength=len(slots) * n_weeks,
+        ).reshape(len(slots), n_weeks)
         
-        fig.update_layout(
-            height=400,
-            xaxis_title="Week",
-            yaxis_title="Tickets",
-            legend=dict(orientation="h", yanchor="bottom", y=1.02),
-            margin=dict(l=20, r=20, t=40, b=20),
+        weeks = tuple(format_week_key(k) for k in week_keys[first:].tolist())
+        series = tuple(
+            (entity_data.names[slot], tuple(row)) for slot, row in zip(slots.tolist(), counts.tolist())
         )
-        st.plotly_chart(fig, use_container_width=True)
-
-
-def analyze_entities(tickets, entity_type):
-    """Analyze tickets by entity."""
-    entity_data = defaultdict(lambda: {
-        'tickets': 0,
-        'open': 0,
-        'stale': 0,
-        'high_priority': 0,
-        'resolution_times': [],
-        'categories': Counter(),
-    })
-    
-    for t in tickets:
-        # Determine entity name based on type
-        if entity_type == 'vessel':
-            entity = t.entity_name or '(Unknown)'
-        elif entity_type == 'customer':
-            entity = t.company_name or '(Unknown)'
-        else:
-            entity = t.entity_name or t.company_name or '(Unknown)'
-        
-        entity_data[entity]['tickets'] += 1
-        
-        if t.is_open:
-            entity_data[entity]['open'] += 1
-        
-        if t.is_open and t.days_open >= 15:
-            entity_data[entity]['stale'] += 1
-        
-        if t.priority >= 3:
-            entity_data[entity]['high_priority'] += 1
-        
-        if t.resolution_time:
-            entity_data[entity]['resolution_times'].append(t.resolution_time)
-        
-        if t.category:
-            entity_data[entity]['categories'][t.category] += 1
-    
-    # Calculate health scores and averages
-    for entity, data in entity_data.items():
-        # Average resolution
-        if data['resolution_times']:
-            data['avg_resolution'] = round(
-                sum(data['resolution_times']) / len(data['resolution_times']), 1
-            )
-        else:
-            data['avg_resolution'] = 0
-        
-        # Health score
-        score = 100
-        score -= data['stale'] * 15
-        score -= data['high_priority'] * 3
-        if data['open'] > data['tickets'] * 0.3:
-            score -= 10
+        st.session_state['_entity_trend'] = (weeks, series)
+        st.session_state['_entity_trend_stamp'] = stamp
+    return st.session_state['_entity_trend']
+
+
+# Entity name per ticket from the (entity_name, company_name) columns, by
+# entity type; any other type falls back from entity to company
+ENTITY_KEY_BUILDERS = {
+    'vessel': lambda entity, company: entity,
+    'customer': lambda entity, company: company,
+}
+
+
+def _default_entity_key(entity, company):
+    return np.where(entity != '', entity, company)
+
+
+def _entity_keys(arrays, entity_type):
+    """Per-ticket entity name for `entity_type` as an object array.
+    
+    The builder is picked once per call, so there is no per-ticket branch
+    on the type. Missing names become '(Unknown)'.
+    """
+    build = ENTITY_KEY_BUILDERS.get(entity_type, _default_entity_key)
+    keys = build(arrays['entity_name'], arrays['company_name'])
+    return np.where(keys != '', keys, '(Unknown)')
+
+
+@dataclass
+class EntityAggregates:
+    """Per-entity counters from analyze_entities(), one array slot per entity.
+    
+    Slots are in first-appearance order. Dict rows are only built for the
+    entities a view actually shows, via ranked() and rows().
+    """
+    ticket_slot: np.ndarray  # Per ticket: its entity's slot
+    names: np.ndarray
+    display_names: np.ndarray  # Names cut to the table's 35 characters
+    tickets: np.ndarray
+    open: np.ndarray
+    stale: np.ndarray
+    high_priority: np.ndarray
+    avg_resolution: np.ndarray
+    health_code: np.ndarray  # Index into HEALTH_LABELS
+    health: np.ndarray
+    # One entry per (entity, category) pair, in first-appearance order
+    cat_slot: np.ndarray
+    cat_name: np.ndarray
+    cat_count: np.ndarray
+    
+    def __len__(self):
+        return len(self.names)
+    
+    def ranked(self, field: str, k: int = None, mask: np.ndarray = None) -> np.ndarray:
+        """Slots ordered by `field` descending, ties by first appearance.
         
-        if score >= 80:
-            data['health'] = '🟢 Good'
-        elif score >= 60:
-            data['health'] = '🟡 Fair'
-        elif score >= 40:
-            data['health'] = '🟠 Needs Attention'
-        else:
-            data['health'] = '🔴 Critical'
+        Matches sorted(..., reverse=True)[:k]. With `k`, np.partition
+        narrows the candidates before the final sort.
+        """
+        values = getattr(self, field)
+        slots = np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+        if k is not None and slots.size > k:
+            cutoff = np.partition(values[slots], -k)[-k]
+            slots = slots[values[slots] >= cutoff]
+        return slots[np.argsort(-values[slots], kind='stable')][:k]
+    
+    def rows(self, slots) -> list:
+        """(name, data) pairs for `slots`, with the per-entity dict layout."""
+        out = []
+        for i in slots.tolist():
+            # Like Counter.most_common(3): ties keep first-appearance order
+            pairs = np.flatnonzero(self.cat_slot == i)
+            top = pairs[np.argsort(-self.cat_count[pairs], kind='stable')[:3]]
+            out.append((self.names[i], {
+                'tickets': int(self.tickets[i]),
+                'open': int(self.open[i]),
+                'stale': int(self.stale[i]),
+                'high_priority': int(self.high_priority[i]),
+                'avg_resolution': float(self.avg_resolution[i]),
+                'health': str(self.health[i]),
+                'top_categories': list(zip(self.cat_name[top].tolist(), self.cat_count[top].tolist())),
+            }))
+        return out
+
+
+def analyze_entities(arrays, entity_type) -> EntityAggregates:
+    """Analyze tickets by entity.
+    
+    `arrays` is get_ticket_arrays() output. Entities are factorized to
+    integer codes in first-appearance order and every per-entity counter
+    is one np.bincount over those codes.
+    """
+    codes, names = pd.factorize(_entity_keys(arrays, entity_type), sort=False)
+    n = len(names)
+    
+    is_open = arrays['is_open']
+    stale = is_open & (days_open(arrays) >= 15)
+    res = arrays['res']
+    # Zero resolution times were never counted towards the average
+    resolved = (res != 0) & ~np.isnan(res)
+    
+    ticket_counts = np.bincount(codes, minlength=n)
+    open_counts = np.bincount(codes[is_open], minlength=n)
+    stale_counts = np.bincount(codes[stale], minlength=n)
+    high_counts = np.bincount(codes[arrays['priority'] >= 3], minlength=n)
+    res_sum = np.bincount(codes[resolved], weights=res[resolved], minlength=n)
+    res_count = np.bincount(codes[resolved], minlength=n)
+    avg_resolution = np.round(res_sum / np.maximum(res_count, 1), 1)
+    
+    # Health score, banded by integer code and mapped to labels once
+    score = 100 - stale_counts * 15 - high_counts * 3
+    score -= np.where(open_counts > ticket_counts * 0.3, 10, 0)
+    health_code = np.digitize(score, HEALTH_THRESHOLDS)
+    
+    # (entity, category) pairs as one integer key, counted in first-appearance order
+    has_cat = arrays['has_category']
+    n_cats = len(arrays['cat_labels'])
+    pair_codes, pairs = pd.factorize(codes[has_cat] * n_cats + arrays['cat_codes'][has_cat], sort=False)
+    
+    return EntityAggregates(
+        ticket_slot=codes,
+        names=np.asarray(names, dtype=object),
+        display_names=pd.Series(names, dtype=object).str.slice(0, 35).to_numpy(),
+        tickets=ticket_counts,
+        open=open_counts,
+        stale=stale_counts,
+        high_priority=high_counts,
+        avg_resolution=avg_resolution,
+        health_code=health_code,
+        health=HEALTH_LABELS[health_code],
+        cat_slot=pairs // n_cats,
+        cat_name=arrays['cat_labels'][pairs % n_cats],
+        cat_count=np.bincount(pair_codes, minlength=len(pairs)),
+    )
+
+
+# =============================================================================
+# FIGURE BUILDERS
+# =============================================================================
+# Cached on the aggregated values, so reruns that don't change the data
+# skip figure construction; stable chart keys let the frontend update the
+# existing chart instead of remounting it.
+
+HEALTH_COLORS = {
+    '🟢 Good': '#10B981',
+    '🟡 Fair': '#F59E0B',
+    '🟠 Needs Attention': '#F97316',
+    '🔴 Critical': '#EF4444',
+}
+
+
+@st.cache_data(show_spinner=False)
+def _build_volume_bar(entity_counts: tuple) -> go.Figure:
+    """Build the horizontal ticket volume bar from (entity, tickets) pairs."""
+    fig = go.Figure(data=[go.Bar(
+        x=[count for _, count in entity_counts],
+        y=[name[:25] for name, _ in entity_counts],
+        orientation='h',
+        marker_color='#1F4E79',
+    )])
+    fig.update_layout(
+        height=400,
+        xaxis_title="Tickets",
+        yaxis=dict(autorange="reversed"),
+        margin=dict(l=20, r=20, t=20, b=20),
+        uirevision='entities-volume',  # Keep zoom/pan across reruns
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _build_health_pie(health_counts: tuple) -> go.Figure:
+    """Build the health distribution donut from (health, count) pairs."""
+    fig = go.Figure(data=[go.Pie(
+        labels=[h for h, _ in health_counts],
+        values=[c for _, c in health_counts],
+        hole=0.4,
+        marker=dict(colors=[HEALTH_COLORS.get(h, '#6B7280') for h, _ in health_counts]),
+    )])
+    fig.update_layout(
+        height=400,
+        margin=dict(l=20, r=20, t=20, b=20),
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _build_entity_trend(weeks: tuple, series: tuple) -> go.Figure:
+    """Build the weekly ticket trend lines from week labels and (entity, counts) pairs."""
+    fig = go.Figure()
+    for name, counts in series:
+        fig.add_trace(go.Scatter(
+            x=list(weeks),
+            y=list(counts),
+            name=name[:20],
+            mode='lines+markers',
+        ))
     
-    return dict(entity_data)
+    fig.update_layout(
+        height=400,
+        xaxis_title="Week",
+        yaxis_title="Tickets",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02),
+        margin=dict(l=20, r=20, t=40, b=20),
+        uirevision='entities-trends',  # Keep zoom/pan and hidden traces across reruns
+    )
+    return fig
 
 
 # =============================================================================
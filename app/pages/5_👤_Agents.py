@@ -5,19 +5,15 @@ Agent performance tracking and analysis with premium analytics.
 """
 
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from datetime import datetime, timedelta
-from collections import Counter, defaultdict
 import sys
 from pathlib import Path
 import numpy as np
+import pandas as pd
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from core.session_state import init_session_state, apply_filters
-from core.data_loader import analyze_by_agent
+from core.session_state import init_session_state, apply_filters, get_filter_signature, get_ticket_arrays
+from core.data_loader import build_agent_cache
 from core.ui_components import inject_beta_badge
 
 # Page config
@@ -29,6 +25,44 @@ inject_beta_badge()
 # Initialize
 init_session_state()
 
+# Bar colors for good / borderline / poor agent metrics
+GOOD_COLOR, WARN_COLOR, BAD_COLOR = '#10B981', '#F59E0B', '#EF4444'
+
+# Top performer score weights: SLA, FCR, resolution rate, consistency
+PERFORMANCE_WEIGHTS = np.array([0.3, 0.25, 0.25, 0.2])
+
+# Columns of the get_agent_data() frame
+AGENT_COLUMNS = [
+    'agent_name', 'tickets', 'resolved', 'open', 'avg_response', 'sla_rate', 'fcr_rate',
+    'avg_touches', 'complexity', 'response_consistency', 'resolution_rate', 'customer_coverage',
+]
+
+# Performance table: agent frame column -> table header
+PERFORMANCE_TABLE_COLUMNS = {
+    'agent_name': 'Agent',
+    'tickets': 'Tickets',
+    'resolved': 'Resolved',
+    'open': 'Open',
+    'resolution_rate': 'Res. Rate',
+    'avg_response': 'Avg Resp.',
+    'sla_rate': 'SLA %',
+    'fcr_rate': 'FCR %',
+    'avg_touches': 'Touches',
+    'response_consistency': 'Consistency',
+    'complexity': 'Complexity',
+    'customer_coverage': 'Customers',
+}
+
+# Display formats for the numeric performance table columns
+PERFORMANCE_TABLE_FORMATS = {
+    'Res. Rate': '{:.0f}%',
+    'Avg Resp.': '{:.1f}h',
+    'SLA %': '{:.0f}%',
+    'FCR %': '{:.0f}%',
+    'Consistency': '±{:.1f}h',
+    'Complexity': '{:.0f}%',
+}
+
 
 def render_premium_kpi_card(title: str, value: str, subtitle: str = None, delta: str = None, help_text: str = None):
     """Render a premium KPI card with optional subtitle and help tooltip."""
@@ -46,93 +80,46 @@ def render_activity_heatmap(tickets):
     st.subheader("🗓️ Activity Heatmap")
     st.caption("When tickets are handled - darker = higher activity")
     
-    # Build activity matrix
-    days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-    day_order = {d: i for i, d in enumerate(days)}
-    
-    activity = defaultdict(int)
-    for t in tickets:
-        if t.created_at and t.responder_id:
-            day = t.created_at.strftime('%a')
-            hour = t.created_at.hour
-            activity[(day, hour)] += 1
+    # Build activity matrix: one bincount over (hour, weekday) cells of
+    # assigned, dated tickets
+    arrays = get_ticket_arrays(tickets)
+    created = arrays['created'][(arrays['responder_id'] != 0) & ~np.isnat(arrays['created'])]
+    day_num = created.astype('datetime64[D]').astype(np.int64)
+    weekday = (day_num + 3) % 7  # Monday = 0; 1970-01-01 was a Thursday
+    hour = created.astype('datetime64[h]').astype(np.int64) - day_num * 24
     
     # Create matrix [hours x days]
-    z = [[activity.get((d, h), 0) for d in days] for h in range(24)]
-    
-    fig = go.Figure(data=go.Heatmap(
-        z=z,
-        x=days,
-        y=[f"{h:02d}:00" for h in range(24)],
-        colorscale='Blues',
-        hoverongaps=False,
-        hovertemplate='%{x} at %{y}<br>Tickets: %{z}<extra></extra>',
-    ))
+    z = np.bincount(hour * 7 + weekday, minlength=24 * 7).reshape(24, 7).tolist()
     
-    fig.update_layout(
-        height=450,
-        margin=dict(l=60, r=20, t=20, b=40),
-        xaxis_title="Day of Week",
-        yaxis_title="Hour of Day",
-        yaxis=dict(autorange="reversed"),
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    fig = _build_activity_heatmap(tuple(map(tuple, z)))
+    st.plotly_chart(fig, use_container_width=True, key="agents_activity_heatmap")
 
 
-def render_agent_metric_heatmap(agent_data, sorted_agents):
+def render_agent_metric_heatmap(agents: pd.DataFrame):
     """Render agent-by-metric performance heatmap."""
     st.subheader("🎯 Agent Performance Matrix")
     st.caption("Compare agents across key metrics - greener = better")
     
     # Select top agents for readability
-    top_agents = sorted_agents[:12]
+    top_agents = agents.head(12)
     
     if len(top_agents) < 2:
         st.info("Need at least 2 agents to render comparison heatmap")
         return
     
-    # Define metrics to compare (normalized 0-100 where higher is better)
-    metrics = ['SLA %', 'FCR %', 'Resolution %', 'Consistency', 'Volume']
-    
     # Build matrix
-    agent_names = [data['agent_name'][:15] for _, data in top_agents]
-    z = []
-    
-    # Normalize values for heatmap (all scaled 0-100)
-    max_tickets = max(d['tickets'] for _, d in top_agents) if top_agents else 1
-    
-    for _, data in top_agents:
-        row = [
-            data['sla_rate'],
-            data['fcr_rate'],
-            data['resolution_rate'],
-            max(0, 100 - data['response_consistency'] * 5),  # Lower std = better (invert)
-            (data['tickets'] / max_tickets * 100) if max_tickets else 0,
-        ]
-        z.append(row)
-    
-    fig = go.Figure(data=go.Heatmap(
-        z=z,
-        x=metrics,
-        y=agent_names,
-        colorscale='RdYlGn',
-        zmin=0,
-        zmax=100,
-        hoverongaps=False,
-        hovertemplate='%{y}<br>%{x}: %{z:.1f}<extra></extra>',
-        text=[[f"{v:.0f}" for v in row] for row in z],
-        texttemplate="%{text}",
-        textfont={"size": 11},
-    ))
-    
-    fig.update_layout(
-        height=max(300, len(top_agents) * 35),
-        margin=dict(l=120, r=20, t=20, b=60),
-        xaxis_tickangle=-45,
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    agent_names = top_agents['agent_name'].tolist()
+    
+    # Normalize values for heatmap (all scaled 0-100), one column per metric
+    tickets = top_agents['tickets'].to_numpy(dtype=np.float64)
+    z = np.column_stack([
+        top_agents[['sla_rate', 'fcr_rate', 'resolution_rate']].to_numpy(dtype=np.float64),
+        np.maximum(0, 100 - top_agents['response_consistency'].to_numpy() * 5),  # Lower std = better (invert)
+        tickets / tickets.max() * 100,  # Rows are busiest first, so the max is > 0
+    ])
+    
+    fig = _build_metric_matrix(tuple(agent_names), tuple(map(tuple, z.tolist())))
+    st.plotly_chart(fig, use_container_width=True, key="agents_metric_matrix")
 
 
 def render_agents_page():
@@ -153,16 +140,13 @@ def render_agents_page():
         st.info("No tickets match the current filters.")
         return
     
-    # Analyze by agent
-    agent_data = analyze_by_agent(tickets)
+    # Analyze by agent: one row per agent, busiest first
+    agents = get_agent_data(get_ticket_arrays(tickets), tickets)
     
-    if not agent_data:
+    if agents.empty:
         st.info("No agent data available.")
         return
     
-    # Sort by ticket count
-    sorted_agents = sorted(agent_data.items(), key=lambda x: x[1]['tickets'], reverse=True)
-    
     # =========================================================================
     # PREMIUM KPIs ROW
     # =========================================================================
@@ -175,12 +159,14 @@ def render_agents_page():
     
     kpi_cols = st.columns(7)
     
-    total_agents = len(agent_data)
-    total_tickets = sum(d['tickets'] for d in agent_data.values())
-    avg_tickets = total_tickets / total_agents if total_agents else 0
-    avg_sla = sum(d['sla_rate'] for d in agent_data.values()) / total_agents if total_agents else 0
-    avg_fcr = sum(d['fcr_rate'] for d in agent_data.values()) / total_agents if total_agents else 0
-    avg_resolution = sum(d['resolution_rate'] for d in agent_data.values()) / total_agents if total_agents else 0
+    # One [agents x metrics] matrix, reduced column-wise for every KPI
+    kpi_matrix = agents[
+        ['tickets', 'sla_rate', 'fcr_rate', 'resolution_rate', 'response_consistency']
+    ].to_numpy(dtype=np.float64)
+    
+    total_agents = len(agents)
+    total_tickets = int(kpi_matrix[:, 0].sum())
+    avg_tickets, avg_sla, avg_fcr, avg_resolution, avg_consistency = kpi_matrix.mean(axis=0).tolist()
     
     with kpi_cols[0]:
         st.metric("Total Agents", total_agents)
@@ -198,7 +184,6 @@ def render_agents_page():
         st.metric("Resolution Rate", f"{avg_resolution:.1f}%", help="Average percentage of tickets resolved per agent")
     
     with kpi_cols[5]:
-        avg_consistency = sum(d['response_consistency'] for d in agent_data.values()) / total_agents if total_agents else 0
         st.metric("Avg Consistency", f"±{avg_consistency:.1f}h", help="Response time standard deviation (lower = more consistent)")
     
     with kpi_cols[6]:
@@ -222,7 +207,7 @@ def render_agents_page():
         render_activity_heatmap(tickets)
     
     with col2:
-        render_agent_metric_heatmap(agent_data, sorted_agents)
+        render_agent_metric_heatmap(agents)
     
     # =========================================================================
     # PERFORMANCE TABLE WITH PREMIUM METRICS
@@ -230,128 +215,74 @@ def render_agents_page():
     st.markdown("---")
     st.subheader("📋 Agent Performance Details")
     
-    # Create table data with agent names
-    table_data = []
-    for agent_id, data in sorted_agents:
-        table_data.append({
-            'Agent': data['agent_name'],
-            'Tickets': data['tickets'],
-            'Resolved': data['resolved'],
-            'Open': data['open'],
-            'Res. Rate': f"{data['resolution_rate']:.0f}%",
-            'Avg Resp.': f"{data['avg_response']:.1f}h",
-            'SLA %': f"{data['sla_rate']:.0f}%",
-            'FCR %': f"{data['fcr_rate']:.0f}%",
-            'Touches': data['avg_touches'],
-            'Consistency': f"±{data['response_consistency']:.1f}h",
-            'Complexity': f"{data['complexity']:.0f}%",
-            'Customers': data['customer_coverage'],
-        })
-    
-    import pandas as pd
-    df = pd.DataFrame(table_data)
-    
-    # Style the SLA column
-    def style_sla(val):
-        try:
-            rate = float(val.replace('%', ''))
-            if rate >= 90:
-                return 'background-color: #D1FAE5; color: #065F46'
-            elif rate >= 70:
-                return 'background-color: #FEF3C7; color: #92400E'
-            else:
-                return 'background-color: #FEE2E2; color: #991B1B'
-        except:
-            return ''
-    
-    styled_df = df.style.applymap(style_sla, subset=['SLA %', 'FCR %', 'Res. Rate'])
+    # Raw numeric columns straight from the agent frame; units are added
+    # at display time
+    df = agents[list(PERFORMANCE_TABLE_COLUMNS)].rename(columns=PERFORMANCE_TABLE_COLUMNS).reset_index(drop=True)
+    
+    # Color the rate columns from the numeric rates, rounded like the
+    # displayed text: one vectorized pass, no per-cell string parsing
+    rate_columns = ['SLA %', 'FCR %', 'Res. Rate']
+    rates = df[rate_columns].to_numpy().round()
+    rate_css = np.select(
+        [rates >= 90, rates >= 70],
+        ['background-color: #D1FAE5; color: #065F46', 'background-color: #FEF3C7; color: #92400E'],
+        default='background-color: #FEE2E2; color: #991B1B',
+    )
+    
+    styled_df = (
+        df.style
+        .format(PERFORMANCE_TABLE_FORMATS)
+        .apply(lambda _: rate_css, axis=None, subset=rate_columns)
+    )
     st.dataframe(styled_df, use_container_width=True, hide_index=True)
     
     # =========================================================================
     # PREMIUM CHARTS ROW
     # =========================================================================
     st.markdown("---")
+    
+    # Chart metrics as columns in volume order; each chart ranks a column
+    # with a stable argsort, so ties keep volume order
+    agent_names = agents['agent_name'].to_numpy()
+    fcr, touches, consistency, complexity = agents[
+        ['fcr_rate', 'avg_touches', 'response_consistency', 'complexity']
+    ].to_numpy(dtype=np.float64).T
+    
     col1, col2, col3 = st.columns(3)
     
     with col1:
         st.subheader("🎯 FCR by Agent")
         st.caption("First Contact Resolution Rate")
         
-        fcr_sorted = sorted(sorted_agents, key=lambda x: x[1]['fcr_rate'], reverse=True)[:10]
+        fcr_idx = np.argsort(-fcr, kind='stable')[:10]
         
-        fig = go.Figure(data=[go.Bar(
-            x=[d['agent_name'][:12] for _, d in fcr_sorted],
-            y=[d['fcr_rate'] for _, d in fcr_sorted],
-            marker_color=[
-                '#10B981' if d['fcr_rate'] >= 50 else
-                '#F59E0B' if d['fcr_rate'] >= 30 else
-                '#EF4444'
-                for _, d in fcr_sorted
-            ],
-        )])
-        fig.add_hline(y=50, line_dash="dash", line_color="green", annotation_text="Target 50%")
-        fig.update_layout(
-            height=300,
-            margin=dict(l=20, r=20, t=20, b=60),
-            yaxis_range=[0, 100],
-            yaxis_title="FCR %",
-            xaxis_tickangle=-45,
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        fig = _build_fcr_bar(tuple(agent_names[fcr_idx].tolist()), tuple(fcr[fcr_idx].tolist()))
+        st.plotly_chart(fig, use_container_width=True, key="agents_fcr_bar")
     
     with col2:
         st.subheader("📊 Utilization")
         st.caption("Workload Distribution")
         
         # Pie chart
-        top_10 = sorted_agents[:10]
-        others = sum(a[1]['tickets'] for a in sorted_agents[10:])
-        
-        labels = [d['agent_name'][:12] for _, d in top_10]
-        values = [d['tickets'] for _, d in top_10]
+        labels = agents['agent_name'].iloc[:10].tolist()
+        values = agents['tickets'].iloc[:10].tolist()
+        others = int(agents['tickets'].iloc[10:].sum())
         
         if others > 0:
             labels.append('Others')
             values.append(others)
         
-        fig = go.Figure(data=[go.Pie(
-            labels=labels,
-            values=values,
-            hole=0.4,
-            textinfo='label+percent',
-        )])
-        fig.update_layout(
-            height=300,
-            margin=dict(l=20, r=20, t=20, b=20),
-            showlegend=False,
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        fig = _build_utilization_pie(tuple(labels), tuple(values))
+        st.plotly_chart(fig, use_container_width=True, key="agents_utilization_pie")
     
     with col3:
         st.subheader("⚡ Ticket Touches")
         st.caption("Avg messages per ticket (lower = efficient)")
         
-        touches_sorted = sorted(sorted_agents, key=lambda x: x[1]['avg_touches'])[:10]
+        touches_idx = np.argsort(touches, kind='stable')[:10]
         
-        fig = go.Figure(data=[go.Bar(
-            x=[d['avg_touches'] for _, d in touches_sorted],
-            y=[d['agent_name'][:15] for _, d in touches_sorted],
-            orientation='h',
-            marker_color=[
-                '#10B981' if d['avg_touches'] <= 2 else
-                '#F59E0B' if d['avg_touches'] <= 4 else
-                '#EF4444'
-                for _, d in touches_sorted
-            ],
-        )])
-        fig.add_vline(x=2, line_dash="dash", line_color="green", annotation_text="Efficient")
-        fig.update_layout(
-            height=300,
-            margin=dict(l=100, r=20, t=20, b=40),
-            xaxis_title="Avg Touches",
-            yaxis=dict(autorange="reversed"),
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        fig = _build_touches_bar(tuple(agent_names[touches_idx].tolist()), tuple(touches[touches_idx].tolist()))
+        st.plotly_chart(fig, use_container_width=True, key="agents_touches_bar")
     
     # =========================================================================
     # CONSISTENCY & COMPLEXITY ANALYSIS
@@ -363,46 +294,23 @@ def render_agents_page():
         st.subheader("📈 Response Consistency")
         st.caption("Lower standard deviation = more predictable response times")
         
-        consistency_sorted = sorted(sorted_agents, key=lambda x: x[1]['response_consistency'])[:12]
+        consistency_idx = np.argsort(consistency, kind='stable')[:12]
         
-        fig = go.Figure(data=[go.Bar(
-            x=[d['agent_name'][:12] for _, d in consistency_sorted],
-            y=[d['response_consistency'] for _, d in consistency_sorted],
-            marker_color=[
-                '#10B981' if d['response_consistency'] <= 5 else
-                '#F59E0B' if d['response_consistency'] <= 15 else
-                '#EF4444'
-                for _, d in consistency_sorted
-            ],
-        )])
-        fig.update_layout(
-            height=350,
-            margin=dict(l=20, r=20, t=20, b=60),
-            yaxis_title="Std Dev (hours)",
-            xaxis_tickangle=-45,
+        fig = _build_consistency_bar(
+            tuple(agent_names[consistency_idx].tolist()), tuple(consistency[consistency_idx].tolist())
         )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key="agents_consistency_bar")
     
     with col2:
         st.subheader("🔥 Complexity Load")
         st.caption("% of High/Urgent priority tickets handled")
         
-        complexity_sorted = sorted(sorted_agents, key=lambda x: x[1]['complexity'], reverse=True)[:12]
+        complexity_idx = np.argsort(-complexity, kind='stable')[:12]
         
-        fig = go.Figure(data=[go.Bar(
-            x=[d['agent_name'][:12] for _, d in complexity_sorted],
-            y=[d['complexity'] for _, d in complexity_sorted],
-            marker_color='#6366F1',
-        )])
-        fig.add_hline(y=30, line_dash="dash", line_color="orange", annotation_text="High complexity")
-        fig.update_layout(
-            height=350,
-            margin=dict(l=20, r=20, t=20, b=60),
-            yaxis_title="% High/Urgent",
-            yaxis_range=[0, 100],
-            xaxis_tickangle=-45,
+        fig = _build_complexity_bar(
+            tuple(agent_names[complexity_idx].tolist()), tuple(complexity[complexity_idx].tolist())
         )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key="agents_complexity_bar")
     
     # =========================================================================
     # TOP PERFORMERS & NEEDS ATTENTION
@@ -413,29 +321,23 @@ def render_agents_page():
     with col1:
         st.subheader("🏆 Top Performers")
         
-        # Score based on multiple metrics
-        scored = []
-        for agent_id, data in sorted_agents:
-            score = (
-                data['sla_rate'] * 0.3 +
-                data['fcr_rate'] * 0.25 +
-                data['resolution_rate'] * 0.25 +
-                max(0, 100 - data['response_consistency'] * 2) * 0.2
-            )
-            scored.append((agent_id, data, score))
-        
-        top_performers = sorted(scored, key=lambda x: x[2], reverse=True)[:5]
+        # Score based on multiple metrics: weighted sum of one feature row per agent
+        features = agents[
+            ['sla_rate', 'fcr_rate', 'resolution_rate', 'response_consistency']
+        ].to_numpy(dtype=np.float64)
+        features[:, 3] = np.maximum(0, 100 - features[:, 3] * 2)
+        scores = features @ PERFORMANCE_WEIGHTS
         
-        for i, (agent_id, data, score) in enumerate(top_performers, 1):
+        for i, idx in enumerate(_top_k(scores, 5).tolist(), 1):
+            data = agents.iloc[idx]
             medal = {1: '🥇', 2: '🥈', 3: '🥉'}.get(i, '⭐')
-            st.markdown(f"{medal} **{data['agent_name']}**: Score {score:.0f} | SLA {data['sla_rate']:.0f}% | FCR {data['fcr_rate']:.0f}%")
+            st.markdown(f"{medal} **{data['agent_name']}**: Score {scores[idx]:.0f} | SLA {data['sla_rate']:.0f}% | FCR {data['fcr_rate']:.0f}%")
     
     with col2:
         st.subheader("⚠️ Needs Coaching")
         
-        bottom_performers = sorted(scored, key=lambda x: x[2])[:5]
-        
-        for agent_id, data, score in bottom_performers:
+        for idx in _top_k(-scores, 5).tolist():
+            data = agents.iloc[idx]
             issues = []
             if data['sla_rate'] < 70:
                 issues.append(f"SLA {data['sla_rate']:.0f}%")
@@ -448,6 +350,286 @@ def render_agents_page():
             st.markdown(f"🔴 **{data['agent_name']}**: {issue_str}")
 
 
+def _top_k(values: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` largest values, largest first, ties by index.
+    
+    Matches np.argsort(-values, kind='stable')[:k]; np.partition narrows
+    the candidates (plus anything tied with the k-th) before the sort.
+    """
+    idx = np.arange(values.size)
+    if values.size > k:
+        idx = idx[values >= np.partition(values, -k)[-k]]
+    return idx[np.argsort(-values[idx], kind='stable')][:k]
+
+
+def get_agent_data(arrays, tickets):
+    """Per-agent metrics for the filtered tickets.
+    
+    Memoized in session state on the filter signature and the AI enrichment
+    timestamp (AI runs rewrite ticket categories), so reruns reuse the
+    aggregation instead of redoing it.
+    """
+    stamp = (get_filter_signature(), st.session_state.get('ai_enrichment', {}).get('timestamp'))
+    if st.session_state.get('_agent_data_stamp') != stamp:
+        st.session_state['_agent_data'] = analyze_agents(arrays, tickets)
+        st.session_state['_agent_data_stamp'] = stamp
+    return st.session_state['_agent_data']
+
+
+def analyze_agents(arrays, tickets) -> pd.DataFrame:
+    """Per-agent metrics from get_ticket_arrays(), one row per responder id.
+    
+    Same values as analyze_by_agent() for the fields this page reads, but
+    every counter is one np.bincount over the assigned tickets instead of
+    a per-ticket Python walk, and the result is columnar. Rows are sorted
+    by ticket count, ties in first-appearance order. Only the name lookup
+    still touches Ticket objects.
+    """
+    assigned = arrays['responder_id'] != 0
+    agent, agent_ids = pd.factorize(arrays['responder_id'][assigned])
+    n = len(agent_ids)
+    if n == 0:
+        return pd.DataFrame(columns=AGENT_COLUMNS)
+    
+    def count(mask):
+        return np.bincount(agent[mask], minlength=n)
+    
+    status = arrays['status'][assigned]
+    priority = arrays['priority'][assigned]
+    messages = arrays['agent_messages'][assigned]
+    frt = arrays['frt'][assigned]
+    res = arrays['res'][assigned]
+    
+    is_resolved = (status == 4) | (status == 5)
+    # Zero hours counts as missing, like the truthiness checks on Ticket
+    has_frt = ~np.isnan(frt) & (frt != 0)
+    has_res = ~np.isnan(res) & (res != 0)
+    # First Contact Resolution: resolved with <= 2 agent messages in <= 24h
+    first_contact = is_resolved & (messages <= 2) & has_res & (res <= 24)
+    
+    tickets_n = np.bincount(agent, minlength=n)
+    resolved = count(is_resolved)
+    fcr = count(first_contact)
+    open_n = count(arrays['is_open'][assigned])
+    high = count((priority == 3) | (priority == 4))
+    touches = np.bincount(agent, weights=messages, minlength=n)
+    n_frt = count(has_frt)
+    sla_met = count(has_frt & (frt <= 12))
+    
+    # Population std of response times, two-pass like the original
+    frt_sum = np.bincount(agent[has_frt], weights=frt[has_frt], minlength=n)
+    frt_mean = frt_sum / np.maximum(n_frt, 1)
+    deviation = np.where(has_frt, frt - frt_mean[agent], 0.0)
+    frt_std = np.sqrt(np.bincount(agent, weights=deviation * deviation, minlength=n) / np.maximum(n_frt, 1))
+    
+    # Unique non-empty companies per agent
+    company = arrays['company_name'][assigned]
+    has_company = company != ''
+    company_codes, companies = pd.factorize(company[has_company])
+    pairs = np.unique(agent[has_company] * len(companies) + company_codes)
+    coverage = np.bincount(pairs // max(len(companies), 1), minlength=n)
+    
+    names = build_agent_cache(tickets)
+    agents = pd.DataFrame({
+        'agent_name': [names.get(agent_id, f'Agent #{agent_id}') for agent_id in agent_ids.tolist()],
+        'tickets': tickets_n,
+        'resolved': resolved,
+        'open': open_n,
+        'avg_response': _round1(frt_mean),
+        'sla_rate': _percent(sla_met, n_frt),
+        'fcr_rate': _percent(fcr, resolved),
+        'avg_touches': _round1(touches / tickets_n),
+        'complexity': _percent(high, tickets_n),
+        'response_consistency': np.where(n_frt > 1, _round1(frt_std), 0.0),
+        'resolution_rate': _percent(resolved, tickets_n),
+        'customer_coverage': coverage,
+    }, index=agent_ids, columns=AGENT_COLUMNS)
+    return agents.sort_values('tickets', ascending=False, kind='stable')
+
+
+def _round1(values: np.ndarray) -> np.ndarray:
+    """round(v, 1) per value.
+    
+    np.round scales by 10 before rounding, which can land on the other
+    side of a tie than Python's correctly rounded round(); thresholds and
+    labels on this page compare the rounded values.
+    """
+    return np.array([round(v, 1) for v in values.tolist()], dtype=np.float64)
+
+
+def _percent(part: np.ndarray, whole: np.ndarray) -> np.ndarray:
+    """round(part / whole * 100, 1), or 0 where `whole` is 0."""
+    ratio = np.divide(part, whole, out=np.zeros(len(part)), where=whole > 0)
+    return _round1(ratio * 100)
+
+
+# =============================================================================
+# FIGURE BUILDERS
+# =============================================================================
+# Cached on the aggregated values, so reruns that don't change the data
+# skip figure construction.
+
+@st.cache_data(show_spinner=False)
+def _build_activity_heatmap(z: tuple):
+    """Build the hour x weekday activity heatmap from a 24 x 7 count matrix."""
+    import plotly.graph_objects as go
+    
+    fig = go.Figure(data=go.Heatmap(
+        z=[list(row) for row in z],
+        x=['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
+        y=[f"{h:02d}:00" for h in range(24)],
+        colorscale='Blues',
+        hoverongaps=False,
+        hovertemplate='%{x} at %{y}<br>Tickets: %{z}<extra></extra>',
+    ))
+    
+    fig.update_layout(
+        height=450,
+        margin=dict(l=60, r=20, t=20, b=40),
+        xaxis_title="Day of Week",
+        yaxis_title="Hour of Day",
+        yaxis=dict(autorange="reversed"),
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _build_metric_matrix(agent_names: tuple, z: tuple):
+    """Build the agent x metric heatmap from per-agent rows of 0-100 scores."""
+    import plotly.graph_objects as go
+    
+    fig = go.Figure(data=go.Heatmap(
+        z=[list(row) for row in z],
+        x=['SLA %', 'FCR %', 'Resolution %', 'Consistency', 'Volume'],
+        y=[name[:15] for name in agent_names],
+        colorscale='RdYlGn',
+        zmin=0,
+        zmax=100,
+        hoverongaps=False,
+        hovertemplate='%{y}<br>%{x}: %{z:.1f}<extra></extra>',
+        text=[[f"{v:.0f}" for v in row] for row in z],
+        texttemplate="%{text}",
+        textfont={"size": 11},
+    ))
+    
+    fig.update_layout(
+        height=max(300, len(agent_names) * 35),
+        margin=dict(l=120, r=20, t=20, b=60),
+        xaxis_tickangle=-45,
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _build_fcr_bar(agent_names: tuple, rates: tuple):
+    """Build the FCR rate bar chart against the 50% target."""
+    import plotly.graph_objects as go
+    
+    values = np.array(rates, dtype=np.float64)
+    fig = go.Figure(data=[go.Bar(
+        x=[name[:12] for name in agent_names],
+        y=list(rates),
+        marker_color=np.select(
+            [values >= 50, values >= 30], [GOOD_COLOR, WARN_COLOR], default=BAD_COLOR,
+        ).tolist(),
+    )])
+    fig.add_hline(y=50, line_dash="dash", line_color="green", annotation_text="Target 50%")
+    fig.update_layout(
+        height=300,
+        margin=dict(l=20, r=20, t=20, b=60),
+        yaxis_range=[0, 100],
+        yaxis_title="FCR %",
+        xaxis_tickangle=-45,
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _build_utilization_pie(labels: tuple, values: tuple):
+    """Build the workload share donut from (agent or 'Others') ticket counts."""
+    import plotly.graph_objects as go
+    
+    fig = go.Figure(data=[go.Pie(
+        labels=[label[:12] for label in labels],
+        values=list(values),
+        hole=0.4,
+        textinfo='label+percent',
+    )])
+    fig.update_layout(
+        height=300,
+        margin=dict(l=20, r=20, t=20, b=20),
+        showlegend=False,
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _build_touches_bar(agent_names: tuple, touches: tuple):
+    """Build the horizontal average-touches bar chart."""
+    import plotly.graph_objects as go
+    
+    values = np.array(touches, dtype=np.float64)
+    fig = go.Figure(data=[go.Bar(
+        x=list(touches),
+        y=[name[:15] for name in agent_names],
+        orientation='h',
+        marker_color=np.select(
+            [values <= 2, values <= 4], [GOOD_COLOR, WARN_COLOR], default=BAD_COLOR,
+        ).tolist(),
+    )])
+    fig.add_vline(x=2, line_dash="dash", line_color="green", annotation_text="Efficient")
+    fig.update_layout(
+        height=300,
+        margin=dict(l=100, r=20, t=20, b=40),
+        xaxis_title="Avg Touches",
+        yaxis=dict(autorange="reversed"),
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _build_consistency_bar(agent_names: tuple, std_hours: tuple):
+    """Build the response time standard deviation bar chart."""
+    import plotly.graph_objects as go
+    
+    values = np.array(std_hours, dtype=np.float64)
+    fig = go.Figure(data=[go.Bar(
+        x=[name[:12] for name in agent_names],
+        y=list(std_hours),
+        marker_color=np.select(
+            [values <= 5, values <= 15], [GOOD_COLOR, WARN_COLOR], default=BAD_COLOR,
+        ).tolist(),
+    )])
+    fig.update_layout(
+        height=350,
+        margin=dict(l=20, r=20, t=20, b=60),
+        yaxis_title="Std Dev (hours)",
+        xaxis_tickangle=-45,
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _build_complexity_bar(agent_names: tuple, complexity: tuple):
+    """Build the high/urgent share bar chart."""
+    import plotly.graph_objects as go
+    
+    fig = go.Figure(data=[go.Bar(
+        x=[name[:12] for name in agent_names],
+        y=list(complexity),
+        marker_color='#6366F1',
+    )])
+    fig.add_hline(y=30, line_dash="dash", line_color="orange", annotation_text="High complexity")
+    fig.update_layout(
+        height=350,
+        margin=dict(l=20, r=20, t=20, b=60),
+        yaxis_title="% High/Urgent",
+        yaxis_range=[0, 100],
+        xaxis_tickangle=-45,
+    )
+    return fig
+
+
 # =============================================================================
 # MAIN
 # =============================================================================
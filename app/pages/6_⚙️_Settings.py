@@ -6,6 +6,7 @@ Allows customization of all aspects of the platform.
 """
 
 import streamlit as st
+import pandas as pd
 import yaml
 from datetime import datetime
 import sys
@@ -30,10 +31,98 @@ inject_beta_badge()
 init_session_state()
 config = get_config()
 
+# Tab bodies rerun on their own when their widgets change (st.fragment,
+# Streamlit 1.37+; experimental_fragment on 1.33-1.36). Older versions
+# have no partial reruns, so the tabs simply render with the full page.
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda func: func)
+
+# Option lists for the settings widgets, built once per process
+INDUSTRY_PRESETS = ('custom', *INDUSTRY_TEMPLATES)
+PRESET_LABELS = {'custom': 'Custom', **{key: template['name'] for key, template in INDUSTRY_TEMPLATES.items()}}
+ENTITY_OPTIONS = ('customer', 'vessel', 'site', 'product', 'account')
+PRIORITY_NAMES = ('Urgent', 'High', 'Medium', 'Low')
+TIMEZONES = (
+    'UTC', 'US/Eastern', 'US/Pacific', 'Europe/London', 'Europe/Paris',
+    'Asia/Kolkata', 'Asia/Singapore', 'Asia/Tokyo', 'Australia/Sydney',
+)
+WORK_DAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+AI_PROVIDER_LABELS = {
+    'ollama': '🦙 Ollama (Local)',
+    'openai': '🤖 OpenAI',
+    'anthropic': '🔷 Anthropic',
+    'none': '❌ Disabled',
+}
+AI_PROVIDERS = tuple(AI_PROVIDER_LABELS)
+
+# Holiday calendars are static: names for the selector and each calendar's
+# (date, name) pairs in date order
+HOLIDAY_CALENDAR_LABELS = {key: calendar['name'] for key, calendar in HOLIDAY_CALENDARS.items()}
+SORTED_HOLIDAYS = {
+    key: tuple(sorted(calendar['holidays'].items())) for key, calendar in HOLIDAY_CALENDARS.items()
+}
+
+# SLA performance bands: (config key, label, icon, default min %, default max %)
+SLA_BANDS = (
+    ('excellent', 'Excellent', '🟢', 95, 100),
+    ('good', 'Good', '🔵', 90, 95),
+    ('acceptable', 'Acceptable', '🟡', 80, 90),
+    ('needs_improvement', 'Needs Improvement', '🟠', 70, 80),
+    ('poor', 'Poor', '🔴', 0, 70),
+)
+
+# Save Configuration: widget key -> config path
+SAVE_MAPPINGS = {
+    # Branding settings
+    'brand_company_name': ('branding', 'company_name'),
+    'brand_platform_name': ('branding', 'platform_name'),
+    'brand_tagline': ('branding', 'tagline'),
+    'brand_primary_color': ('branding', 'primary_color'),
+    'brand_secondary_color': ('branding', 'secondary_color'),
+    'brand_accent_color': ('branding', 'accent_color'),
+
+    # Industry settings
+    'org_name': ('industry', 'name'),
+    'entity_type': ('industry', 'primary_entity'),
+    'entity_field': ('industry', 'entity_field'),
+
+    # SLA settings
+    'sla_frt': ('sla', 'first_response_hours'),
+    'sla_resolution': ('sla', 'resolution_hours'),
+    'sla_stale': ('sla', 'stale_threshold_days'),
+
+    # Working hours
+    'timezone': ('working_hours', 'timezone'),
+    'work_start': ('working_hours', 'start_hour'),
+    'work_end': ('working_hours', 'end_hour'),
+    'work_days': ('working_hours', 'work_days'),
+
+    # AI settings - CRITICAL for model persistence
+    'ai_provider': ('ai', 'provider'),
+    'ollama_url': ('ai', 'ollama', 'base_url'),
+    'ollama_model': ('ai', 'ollama', 'model'),
+    'ai_temperature': ('ai', 'ollama', 'temperature'),
+    'openai_key': ('ai', 'openai', 'api_key'),
+    'openai_model': ('ai', 'openai', 'model'),
+
+    # AI features
+    'ai_clustering': ('ai', 'features', 'issue_clustering'),
+    'ai_root_cause': ('ai', 'features', 'root_cause_analysis'),
+    'ai_auto_cat': ('ai', 'features', 'auto_categorization'),
+    'ai_sentiment': ('ai', 'features', 'sentiment_analysis'),
+
+    # Freshdesk settings
+    'fd_domain': ('freshdesk', 'domain'),
+    'fd_api_key': ('freshdesk', 'api_key'),
+    'fd_group': ('freshdesk', 'group_id'),
+    'fd_days': ('freshdesk', 'days_to_fetch'),
+}
+
 
 def render_freshdesk_connector(config):
     """Render Freshdesk connector settings and sync UI."""
     
+    freshdesk_config = config.get('freshdesk', default={})
+    
     st.markdown("##### 🎫 Freshdesk Configuration")
     
     col1, col2 = st.columns(2)
@@ -41,7 +130,7 @@ def render_freshdesk_connector(config):
     with col1:
         domain = st.text_input(
             "Domain",
-            value=config.get('freshdesk', 'domain', default=''),
+            value=freshdesk_config.get('domain', ''),
             placeholder="your-company",
             key="fd_domain",
             help="Your Freshdesk subdomain (company.freshdesk.com → 'company')"
@@ -50,7 +139,7 @@ def render_freshdesk_connector(config):
         api_key = st.text_input(
             "API Key",
             type="password",
-            value=config.get('freshdesk', 'api_key', default=''),
+            value=freshdesk_config.get('api_key', ''),
             key="fd_api_key",
             help="Found in Profile Settings → API Key"
         )
@@ -58,7 +147,7 @@ def render_freshdesk_connector(config):
     with col2:
         group_id = st.number_input(
             "Group ID (optional)",
-            value=config.get('freshdesk', 'group_id', default=0) or 0,
+            value=freshdesk_config.get('group_id', 0) or 0,
             min_value=0,
             key="fd_group",
             help="Filter tickets by support group"
@@ -66,7 +155,7 @@ def render_freshdesk_connector(config):
         
         days_to_fetch = st.number_input(
             "Days to Fetch",
-            value=config.get('freshdesk', 'days_to_fetch', default=180),
+            value=freshdesk_config.get('days_to_fetch', 180),
             min_value=1,
             max_value=365,
             key="fd_days"
@@ -77,7 +166,7 @@ def render_freshdesk_connector(config):
     with col3:
         include_convs = st.toggle(
             "Include conversations",
-            value=config.get('freshdesk', 'include_conversations', default=True),
+            value=freshdesk_config.get('include_conversations', True),
             key="fd_convs",
             help="Required for AI analysis"
         )
@@ -85,7 +174,7 @@ def render_freshdesk_connector(config):
     with col4:
         include_notes = st.toggle(
             "Include private notes",
-            value=config.get('freshdesk', 'include_notes', default=True),
+            value=freshdesk_config.get('include_notes', True),
             key="fd_notes"
         )
     
@@ -228,410 +317,542 @@ def render_settings():
         "📤 Export"
     ])
     
+    # Each tab is its own fragment, so its widgets rerun only that tab
+    with tabs[0]:
+        render_branding_tab(config)
+    
+    with tabs[1]:
+        render_industry_tab(config)
+    
+    with tabs[2]:
+        render_sla_tab(config)
+    
+    with tabs[3]:
+        render_working_hours_tab(config)
+    
+    with tabs[4]:
+        render_categories_tab(config)
+    
+    with tabs[5]:
+        render_patterns_tab(config)
+    
+    with tabs[6]:
+        render_ai_tab(config)
+    
+    with tabs[7]:
+        render_integrations_tab(config)
+    
+    with tabs[8]:
+        render_export_tab(config)
+    
     # =========================================================================
-    # BRANDING TAB
+    # SAVE BUTTON
     # =========================================================================
-    with tabs[0]:
-        st.subheader("🎨 Branding & Personalization")
-        st.caption("Customize the platform appearance for your organization")
+    st.markdown("---")
+    
+    col1, col2, col3 = st.columns([1, 1, 2])
+    
+    with col1:
+        if st.button("💾 Save Configuration", type="primary", use_container_width=True):
+            # Collect all settings from session state widgets and save
+            try:
+                config.update_many({
+                    path: st.session_state[key] for key, path in SAVE_MAPPINGS.items() if key in st.session_state
+                })
+                
+                # Now save to disk (skipped when the file is already up to date)
+                config.save()
+                st.success("✅ Configuration saved!")
+                st.caption(f"Model set to: {st.session_state.get('ollama_model', 'N/A')}")
+            except Exception as e:
+                st.error(f"Error saving: {e}")
+    
+    with col2:
+        if st.button("🔄 Reset to Defaults", use_container_width=True):
+            if st.session_state.get('confirm_reset'):
+                # Reset
+                st.session_state.config = DEFAULT_CONFIG.copy()
+                st.success("✓ Reset to defaults!")
+                del st.session_state['confirm_reset']
+            else:
+                st.session_state['confirm_reset'] = True
+                st.warning("Click again to confirm reset")
+    
+    with col3:
+        st.download_button(
+            "📥 Export Config (YAML)",
+            data=yaml.dump(config.to_dict(), default_flow_style=False),
+            file_name="ftex_config.yaml",
+            mime="text/yaml",
+            use_container_width=True
+        )
+
+
+# =============================================================================
+# BRANDING TAB
+# =============================================================================
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _logo_preview(file_id, _logo_file):
+    """Read an uploaded logo once per upload (keyed on its file_id)."""
+    return _logo_file.getvalue()
+
+
+@fragment
+def render_branding_tab(config):
+    """Render the Branding settings tab."""
+    
+    branding_config = config.get('branding', default={})
+    
+    st.subheader("🎨 Branding & Personalization")
+    st.caption("Customize the platform appearance for your organization")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("##### Company Identity")
         
-        col1, col2 = st.columns(2)
+        st.text_input(
+            "Company Name",
+            value=branding_config.get('company_name', 'My Company'),
+            key="brand_company_name",
+            help="Your company name displayed in the header and exports"
+        )
         
-        with col1:
-            st.markdown("##### Company Identity")
-            
-            st.text_input(
-                "Company Name",
-                value=config.get('branding', 'company_name', default='My Company'),
-                key="brand_company_name",
-                help="Your company name displayed in the header and exports"
-            )
-            
-            st.text_input(
-                "Platform Name",
-                value=config.get('branding', 'platform_name', default='FTEX Ticket Intelligence'),
-                key="brand_platform_name",
-                help="Custom name for your analytics platform"
-            )
-            
-            st.text_input(
-                "Tagline",
-                value=config.get('branding', 'tagline', default='AI-Powered Support Analytics'),
-                key="brand_tagline",
-                help="Short tagline displayed below the platform name"
-            )
-            
-            st.markdown("---")
-            st.markdown("##### Logo & Images")
-            
-            logo_file = st.file_uploader(
-                "Upload Logo",
-                type=['png', 'jpg', 'jpeg', 'svg'],
-                key="brand_logo",
-                help="Recommended: 200x60px, transparent PNG"
-            )
-            
-            if logo_file:
-                st.image(logo_file, width=200, caption="Logo Preview")
-                # Store logo path in session for use across app
-                st.session_state['custom_logo'] = logo_file
-                st.success("✓ Logo uploaded! Click 'Save Configuration' to apply.")
-            
-            favicon_file = st.file_uploader(
-                "Upload Favicon",
-                type=['ico', 'png'],
-                key="brand_favicon",
-                help="16x16 or 32x32 pixels for browser tab icon"
-            )
-            
-            if favicon_file:
-                st.success("✓ Favicon uploaded!")
+        st.text_input(
+            "Platform Name",
+            value=branding_config.get('platform_name', 'FTEX Ticket Intelligence'),
+            key="brand_platform_name",
+            help="Custom name for your analytics platform"
+        )
         
-        with col2:
-            st.markdown("##### Color Theme")
-            
-            primary_color = st.color_picker(
-                "Primary Color",
-                value=config.get('branding', 'primary_color', default='#1F4E79'),
-                key="brand_primary_color",
-                help="Main brand color for headers and accents"
-            )
-            
-            secondary_color = st.color_picker(
-                "Secondary Color",
-                value=config.get('branding', 'secondary_color', default='#2E75B6'),
-                key="brand_secondary_color",
-                help="Secondary color for gradients and highlights"
-            )
-            
-            accent_color = st.color_picker(
-                "Accent Color",
-                value=config.get('branding', 'accent_color', default='#10B981'),
-                key="brand_accent_color",
-                help="Color for success states and CTAs"
-            )
-            
-            st.markdown("---")
-            st.markdown("##### Theme Preview")
-            
-            # Preview card with custom colors
-            preview_style = f"""
-            <div style="
-                background: linear-gradient(135deg, {primary_color} 0%, {secondary_color} 100%);
-                border-radius: 12px;
-                padding: 20px;
-                color: white;
-                margin-bottom: 10px;
-            ">
-                <h3 style="margin: 0; color: white;">📊 {st.session_state.get('brand_platform_name', 'FTEX Ticket Intelligence')}</h3>
-                <p style="margin: 5px 0 0 0; opacity: 0.9; font-size: 14px;">{st.session_state.get('brand_tagline', 'AI-Powered Support Analytics')}</p>
-            </div>
-            <div style="display: flex; gap: 10px; margin-top: 10px;">
-                <span style="background: {primary_color}; color: white; padding: 5px 15px; border-radius: 20px; font-size: 12px;">Primary</span>
-                <span style="background: {secondary_color}; color: white; padding: 5px 15px; border-radius: 20px; font-size: 12px;">Secondary</span>
-                <span style="background: {accent_color}; color: white; padding: 5px 15px; border-radius: 20px; font-size: 12px;">Accent</span>
-            </div>
-            """
-            st.markdown(preview_style, unsafe_allow_html=True)
-            
-            st.markdown("---")
-            st.markdown("##### Export Branding")
-            
-            st.toggle(
-                "Include logo in PDF exports",
-                value=config.get('branding', 'logo_in_exports', default=True),
-                key="brand_logo_exports"
-            )
-            
-            st.toggle(
-                "Include logo in Excel exports",
-                value=config.get('branding', 'logo_in_excel', default=True),
-                key="brand_logo_excel"
-            )
-            
-            st.text_input(
-                "Footer Text",
-                value=config.get('branding', 'footer_text', default='Confidential - Internal Use Only'),
-                key="brand_footer",
-                help="Text displayed in export footers"
-            )
+        st.text_input(
+            "Tagline",
+            value=branding_config.get('tagline', 'AI-Powered Support Analytics'),
+            key="brand_tagline",
+            help="Short tagline displayed below the platform name"
+        )
+        
+        st.markdown("---")
+        st.markdown("##### Logo & Images")
+        
+        logo_file = st.file_uploader(
+            "Upload Logo",
+            type=['png', 'jpg', 'jpeg', 'svg'],
+            key="brand_logo",
+            help="Recommended: 200x60px, transparent PNG"
+        )
+        
+        if logo_file:
+            st.image(_logo_preview(logo_file.file_id, logo_file), width=200, caption="Logo Preview")
+            # Store logo path in session for use across app
+            st.session_state['custom_logo'] = logo_file
+            st.success("✓ Logo uploaded! Click 'Save Configuration' to apply.")
+        
+        favicon_file = st.file_uploader(
+            "Upload Favicon",
+            type=['ico', 'png'],
+            key="brand_favicon",
+            help="16x16 or 32x32 pixels for browser tab icon"
+        )
+        
+        if favicon_file:
+            st.success("✓ Favicon uploaded!")
     
-    # =========================================================================
-    # INDUSTRY TAB
-    # =========================================================================
-    with tabs[1]:
-        st.subheader("Industry Configuration")
-        st.caption("Select a preset or customize for your industry")
+    with col2:
+        render_theme_editor(config)
         
-        col1, col2 = st.columns([1, 2])
+        st.markdown("---")
+        st.markdown("##### Export Branding")
         
-        with col1:
-            # Industry preset selection
-            presets = ['custom'] + list(INDUSTRY_TEMPLATES.keys())
-            preset_labels = ['Custom'] + [INDUSTRY_TEMPLATES[k]['name'] for k in INDUSTRY_TEMPLATES.keys()]
-            
-            current_preset = config.get('industry', 'preset', default='custom')
-            selected_idx = presets.index(current_preset) if current_preset in presets else 0
-            
-            selected_preset = st.selectbox(
-                "Industry Preset",
-                presets,
-                index=selected_idx,
-                format_func=lambda x: INDUSTRY_TEMPLATES.get(x, {}).get('name', 'Custom'),
-                help="Select a preset to auto-configure settings for your industry"
-            )
-            
-            if selected_preset != 'custom' and st.button("Apply Preset", type="primary"):
-                config.apply_template(selected_preset)
-                st.success(f"✓ Applied {INDUSTRY_TEMPLATES[selected_preset]['name']} preset!")
-                st.rerun()
+        st.toggle(
+            "Include logo in PDF exports",
+            value=branding_config.get('logo_in_exports', True),
+            key="brand_logo_exports"
+        )
         
-        with col2:
-            # Custom settings
-            st.text_input(
-                "Organization Name",
-                value=config.get('industry', 'name', default='My Organization'),
-                key="org_name"
-            )
-            
-            entity_options = ['customer', 'vessel', 'site', 'product', 'account']
-            current_entity = config.get('industry', 'primary_entity', default='customer')
-            
-            st.selectbox(
-                "Primary Entity Type",
-                entity_options,
-                index=entity_options.index(current_entity) if current_entity in entity_options else 0,
-                key="entity_type",
-                help="The main entity to track (e.g., vessels for maritime, customers for SaaS)"
-            )
-            
-            st.text_input(
-                "Entity Field Mapping",
-                value=config.get('industry', 'entity_field', default='company.name'),
-                key="entity_field",
-                help="JSON path to the entity field in ticket data (e.g., 'cf_vesselname' or 'company.name')"
-            )
+        st.toggle(
+            "Include logo in Excel exports",
+            value=branding_config.get('logo_in_excel', True),
+            key="brand_logo_excel"
+        )
+        
+        st.text_input(
+            "Footer Text",
+            value=branding_config.get('footer_text', 'Confidential - Internal Use Only'),
+            key="brand_footer",
+            help="Text displayed in export footers"
+        )
+
+
+@fragment
+def render_theme_editor(config):
+    """Render the color pickers and live theme preview.
     
-    # =========================================================================
-    # SLA TAB
-    # =========================================================================
-    with tabs[2]:
-        st.subheader("SLA Configuration")
-        st.caption("Define your service level agreement thresholds")
+    A fragment nested in the Branding tab, so picking a color reruns only
+    the pickers and the preview card.
+    """
+    
+    branding_config = config.get('branding', default={})
+    
+    st.markdown("##### Color Theme")
+    
+    primary_color = st.color_picker(
+        "Primary Color",
+        value=branding_config.get('primary_color', '#1F4E79'),
+        key="brand_primary_color",
+        help="Main brand color for headers and accents"
+    )
+    
+    secondary_color = st.color_picker(
+        "Secondary Color",
+        value=branding_config.get('secondary_color', '#2E75B6'),
+        key="brand_secondary_color",
+        help="Secondary color for gradients and highlights"
+    )
+    
+    accent_color = st.color_picker(
+        "Accent Color",
+        value=branding_config.get('accent_color', '#10B981'),
+        key="brand_accent_color",
+        help="Color for success states and CTAs"
+    )
+    
+    st.markdown("---")
+    st.markdown("##### Theme Preview")
+    
+    # Preview card with custom colors. The HTML is only rebuilt when a color
+    # or the branding text changes; on other reruns the cached string is
+    # re-emitted and Streamlit sends no new delta for the identical element.
+    platform_name = st.session_state.get('brand_platform_name', 'FTEX Ticket Intelligence')
+    tagline = st.session_state.get('brand_tagline', 'AI-Powered Support Analytics')
+    stamp = (primary_color, secondary_color, accent_color, platform_name, tagline)
+    if st.session_state.get('_theme_preview_stamp') != stamp:
+        st.session_state['_theme_preview'] = f"""
+        <div style="
+            background: linear-gradient(135deg, {primary_color} 0%, {secondary_color} 100%);
+            border-radius: 12px;
+            padding: 20px;
+            color: white;
+            margin-bottom: 10px;
+        ">
+            <h3 style="margin: 0; color: white;">📊 {platform_name}</h3>
+            <p style="margin: 5px 0 0 0; opacity: 0.9; font-size: 14px;">{tagline}</p>
+        </div>
+        <div style="display: flex; gap: 10px; margin-top: 10px;">
+            <span style="background: {primary_color}; color: white; padding: 5px 15px; border-radius: 20px; font-size: 12px;">Primary</span>
+            <span style="background: {secondary_color}; color: white; padding: 5px 15px; border-radius: 20px; font-size: 12px;">Secondary</span>
+            <span style="background: {accent_color}; color: white; padding: 5px 15px; border-radius: 20px; font-size: 12px;">Accent</span>
+        </div>
+        """
+        st.session_state['_theme_preview_stamp'] = stamp
+    st.markdown(st.session_state['_theme_preview'], unsafe_allow_html=True)
+
+
+# =============================================================================
+# INDUSTRY TAB
+# =============================================================================
+
+@fragment
+def render_industry_tab(config):
+    """Render the Industry settings tab."""
+    
+    industry_config = config.get('industry', default={})
+    
+    st.subheader("Industry Configuration")
+    st.caption("Select a preset or customize for your industry")
+    
+    col1, col2 = st.columns([1, 2])
+    
+    with col1:
+        # Industry preset selection
+        current_preset = industry_config.get('preset', 'custom')
+        selected_idx = INDUSTRY_PRESETS.index(current_preset) if current_preset in INDUSTRY_PRESETS else 0
         
-        col1, col2 = st.columns(2)
+        selected_preset = st.selectbox(
+            "Industry Preset",
+            INDUSTRY_PRESETS,
+            index=selected_idx,
+            format_func=PRESET_LABELS.get,
+            help="Select a preset to auto-configure settings for your industry"
+        )
         
-        with col1:
-            st.markdown("##### Global Thresholds")
-            
-            st.number_input(
-                "First Response Target (hours)",
-                value=config.get('sla', 'first_response_hours', default=12),
-                min_value=1,
-                max_value=168,
-                key="sla_frt"
-            )
-            
-            st.number_input(
-                "Resolution Target (hours)",
-                value=config.get('sla', 'resolution_hours', default=24),
-                min_value=1,
-                max_value=720,
-                key="sla_resolution"
-            )
-            
-            st.number_input(
-                "Stale Ticket Threshold (days)",
-                value=config.get('sla', 'stale_threshold_days', default=15),
-                min_value=1,
-                max_value=90,
-                key="sla_stale"
-            )
+        if selected_preset != 'custom' and st.button("Apply Preset", type="primary"):
+            config.apply_template(selected_preset)
+            st.success(f"✓ Applied {INDUSTRY_TEMPLATES[selected_preset]['name']} preset!")
+            st.rerun()
+    
+    with col2:
+        # Custom settings
+        st.text_input(
+            "Organization Name",
+            value=industry_config.get('name', 'My Organization'),
+            key="org_name"
+        )
         
-        with col2:
-            st.markdown("##### By Priority")
-            
-            priority_sla = config.get('sla', 'by_priority', default={})
-            
-            for priority in ['Urgent', 'High', 'Medium', 'Low']:
-                with st.expander(f"📌 {priority}", expanded=(priority == 'Urgent')):
-                    col_a, col_b = st.columns(2)
-                    with col_a:
-                        st.number_input(
-                            "First Response (hrs)",
-                            value=priority_sla.get(priority, {}).get('first_response', 12),
-                            min_value=1,
-                            key=f"sla_{priority.lower()}_frt"
-                        )
-                    with col_b:
-                        st.number_input(
-                            "Resolution (hrs)",
-                            value=priority_sla.get(priority, {}).get('resolution', 24),
-                            min_value=1,
-                            key=f"sla_{priority.lower()}_res"
-                        )
+        current_entity = industry_config.get('primary_entity', 'customer')
         
-        st.markdown("---")
-        st.markdown("##### SLA Performance Bands")
+        st.selectbox(
+            "Primary Entity Type",
+            ENTITY_OPTIONS,
+            index=ENTITY_OPTIONS.index(current_entity) if current_entity in ENTITY_OPTIONS else 0,
+            key="entity_type",
+            help="The main entity to track (e.g., vessels for maritime, customers for SaaS)"
+        )
         
-        bands = config.get('sla', 'bands', default={})
-        band_cols = st.columns(5)
+        st.text_input(
+            "Entity Field Mapping",
+            value=industry_config.get('entity_field', 'company.name'),
+            key="entity_field",
+            help="JSON path to the entity field in ticket data (e.g., 'cf_vesselname' or 'company.name')"
+        )
+
+
+# =============================================================================
+# SLA TAB
+# =============================================================================
+
+@fragment
+def render_sla_tab(config):
+    """Render the SLA settings tab."""
+    
+    sla_config = config.get('sla', default={})
+    
+    st.subheader("SLA Configuration")
+    st.caption("Define your service level agreement thresholds")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("##### Global Thresholds")
+        
+        st.number_input(
+            "First Response Target (hours)",
+            value=sla_config.get('first_response_hours', 12),
+            min_value=1,
+            max_value=168,
+            key="sla_frt"
+        )
         
-        band_info = [
-            ('excellent', 'Excellent', '🟢', 95, 100),
-            ('good', 'Good', '🔵', 90, 95),
-            ('acceptable', 'Acceptable', '🟡', 80, 90),
-            ('needs_improvement', 'Needs Improvement', '🟠', 70, 80),
-            ('poor', 'Poor', '🔴', 0, 70),
-        ]
+        st.number_input(
+            "Resolution Target (hours)",
+            value=sla_config.get('resolution_hours', 24),
+            min_value=1,
+            max_value=720,
+            key="sla_resolution"
+        )
         
-        for i, (key, label, icon, default_min, default_max) in enumerate(band_info):
-            with band_cols[i]:
-                st.markdown(f"**{icon} {label}**")
-                st.text(f"{bands.get(key, {}).get('min', default_min)}-{bands.get(key, {}).get('max', default_max)}%")
+        st.number_input(
+            "Stale Ticket Threshold (days)",
+            value=sla_config.get('stale_threshold_days', 15),
+            min_value=1,
+            max_value=90,
+            key="sla_stale"
+        )
     
-    # =========================================================================
-    # WORKING HOURS TAB
-    # =========================================================================
-    with tabs[3]:
-        st.subheader("Working Hours & Holidays")
-        st.caption("Configure business hours for accurate SLA calculations")
+    with col2:
+        st.markdown("##### By Priority")
         
-        col1, col2 = st.columns(2)
+        priority_sla = sla_config.get('by_priority', {})
         
-        with col1:
-            st.markdown("##### Business Hours")
-            
-            import pytz
-            timezones = ['UTC', 'US/Eastern', 'US/Pacific', 'Europe/London', 'Europe/Paris', 
-                        'Asia/Kolkata', 'Asia/Singapore', 'Asia/Tokyo', 'Australia/Sydney']
-            
-            current_tz = config.get('working_hours', 'timezone', default='UTC')
-            st.selectbox(
-                "Timezone",
-                timezones,
-                index=timezones.index(current_tz) if current_tz in timezones else 0,
-                key="timezone"
-            )
-            
-            time_col1, time_col2 = st.columns(2)
-            with time_col1:
-                st.number_input(
-                    "Start Hour",
-                    value=config.get('working_hours', 'start_hour', default=9),
-                    min_value=0,
-                    max_value=23,
-                    key="work_start"
-                )
-            with time_col2:
-                st.number_input(
-                    "End Hour",
-                    value=config.get('working_hours', 'end_hour', default=18),
-                    min_value=0,
-                    max_value=23,
-                    key="work_end"
-                )
-            
-            st.markdown("##### Work Days")
-            days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            current_days = config.get('working_hours', 'work_days', default=[0,1,2,3,4])
-            
-            day_cols = st.columns(7)
-            for i, day in enumerate(days):
-                with day_cols[i]:
-                    st.checkbox(day[:3], value=i in current_days, key=f"day_{i}")
+        for priority in PRIORITY_NAMES:
+            with st.expander(f"📌 {priority}", expanded=(priority == 'Urgent')):
+                col_a, col_b = st.columns(2)
+                with col_a:
+                    st.number_input(
+                        "First Response (hrs)",
+                        value=priority_sla.get(priority, {}).get('first_response', 12),
+                        min_value=1,
+                        key=f"sla_{priority.lower()}_frt"
+                    )
+                with col_b:
+                    st.number_input(
+                        "Resolution (hrs)",
+                        value=priority_sla.get(priority, {}).get('resolution', 24),
+                        min_value=1,
+                        key=f"sla_{priority.lower()}_res"
+                    )
+    
+    st.markdown("---")
+    st.markdown("##### SLA Performance Bands")
+    
+    bands = sla_config.get('bands', {})
+    band_cols = st.columns(5)
+    
+    for i, (key, label, icon, default_min, default_max) in enumerate(SLA_BANDS):
+        with band_cols[i]:
+            st.markdown(f"**{icon} {label}**")
+            st.text(f"{bands.get(key, {}).get('min', default_min)}-{bands.get(key, {}).get('max', default_max)}%")
+
+
+# =============================================================================
+# WORKING HOURS TAB
+# =============================================================================
+
+@st.cache_data(show_spinner=False)
+def _holiday_table(calendar):
+    """Date-ordered holidays of a built-in calendar as a two-column table."""
+    return pd.DataFrame(SORTED_HOLIDAYS[calendar], columns=['Date', 'Holiday'])
+
+
+@fragment
+def render_working_hours_tab(config):
+    """Render the Working Hours settings tab."""
+    
+    working_hours_config = config.get('working_hours', default={})
+    
+    st.subheader("Working Hours & Holidays")
+    st.caption("Configure business hours for accurate SLA calculations")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("##### Business Hours")
         
-        with col2:
-            st.markdown("##### Holiday Calendar")
-            
-            calendar_names = list(HOLIDAY_CALENDARS.keys())
-            calendar_labels = [HOLIDAY_CALENDARS[k]['name'] for k in calendar_names]
-            
-            current_cal = config.get('working_hours', 'holiday_calendar', default='default')
-            
-            selected_cal = st.selectbox(
-                "Select Calendar",
-                calendar_names,
-                format_func=lambda x: HOLIDAY_CALENDARS.get(x, {}).get('name', x),
-                key="holiday_calendar"
+        current_tz = working_hours_config.get('timezone', 'UTC')
+        st.selectbox(
+            "Timezone",
+            TIMEZONES,
+            index=TIMEZONES.index(current_tz) if current_tz in TIMEZONES else 0,
+            key="timezone"
+        )
+        
+        time_col1, time_col2 = st.columns(2)
+        with time_col1:
+            st.number_input(
+                "Start Hour",
+                value=working_hours_config.get('start_hour', 9),
+                min_value=0,
+                max_value=23,
+                key="work_start"
+            )
+        with time_col2:
+            st.number_input(
+                "End Hour",
+                value=working_hours_config.get('end_hour', 18),
+                min_value=0,
+                max_value=23,
+                key="work_end"
             )
-            
-            # Show holidays
-            if selected_cal in HOLIDAY_CALENDARS:
-                holidays = HOLIDAY_CALENDARS[selected_cal]['holidays']
-                st.markdown(f"**{len(holidays)} holidays configured**")
-                
-                with st.expander("View Holidays"):
-                    for date, name in sorted(holidays.items()):
-                        st.text(f"{date}: {name}")
-            
-            st.markdown("---")
-            st.markdown("##### Custom Holidays")
-            
-            with st.expander("➕ Add Custom Holiday"):
-                custom_date = st.date_input("Date", key="custom_holiday_date")
-                custom_name = st.text_input("Holiday Name", key="custom_holiday_name")
-                if st.button("Add Holiday"):
-                    st.success(f"Added: {custom_date} - {custom_name}")
-    
-    # =========================================================================
-    # CATEGORIES TAB
-    # =========================================================================
-    with tabs[4]:
-        st.subheader("Ticket Categories")
-        st.caption("Define categories and their detection keywords")
         
-        st.toggle(
-            "Auto-detect categories",
-            value=config.get('categories', 'auto_detect', default=True),
-            key="auto_categories",
-            help="Automatically categorize tickets based on keywords"
+        st.markdown("##### Work Days")
+        current_days = working_hours_config.get('work_days', [0,1,2,3,4])
+        
+        st.multiselect(
+            "Work Days",
+            range(len(WORK_DAYS)),
+            default=[i for i in range(len(WORK_DAYS)) if i in current_days],
+            format_func=WORK_DAYS.__getitem__,
+            key="work_days",
+            label_visibility="collapsed"
         )
+    
+    with col2:
+        st.markdown("##### Holiday Calendar")
         
-        st.markdown("##### Category Definitions")
+        current_cal = working_hours_config.get('holiday_calendar', 'default')
         
-        categories = config.get('categories', 'custom', default=[])
+        selected_cal = st.selectbox(
+            "Select Calendar",
+            tuple(HOLIDAY_CALENDAR_LABELS),
+            format_func=HOLIDAY_CALENDAR_LABELS.get,
+            key="holiday_calendar"
+        )
         
-        for i, cat in enumerate(categories):
-            with st.expander(f"🏷️ {cat['name']}", expanded=False):
-                col1, col2 = st.columns([1, 2])
-                with col1:
-                    st.text_input("Name", value=cat['name'], key=f"cat_name_{i}")
-                with col2:
-                    st.text_input(
-                        "Keywords (comma-separated)",
-                        value=', '.join(cat['keywords']),
-                        key=f"cat_keywords_{i}"
-                    )
-                if st.button("🗑️ Remove", key=f"cat_remove_{i}"):
-                    st.warning("Category removed (save to apply)")
+        # Show holidays
+        if selected_cal in SORTED_HOLIDAYS:
+            holidays = SORTED_HOLIDAYS[selected_cal]
+            st.markdown(f"**{len(holidays)} holidays configured**")
+            
+            # Built only on request, as one table rather than a line per holiday
+            if st.toggle("View Holidays", key="show_holidays"):
+                st.dataframe(_holiday_table(selected_cal), hide_index=True, use_container_width=True)
         
         st.markdown("---")
-        with st.expander("➕ Add New Category"):
-            new_cat_name = st.text_input("Category Name", key="new_cat_name")
-            new_cat_keywords = st.text_input("Keywords (comma-separated)", key="new_cat_keywords")
-            if st.button("Add Category"):
-                st.success(f"Added category: {new_cat_name}")
-    
-    # =========================================================================
-    # PATTERNS TAB
-    # =========================================================================
-    with tabs[5]:
-        st.subheader("Detection Patterns")
-        st.caption("Configure patterns for detecting canned responses, promises, dependencies, etc.")
+        st.markdown("##### Custom Holidays")
         
-        pattern_tabs = st.tabs(["Canned Responses", "24h Promises", "Dependencies", "Config Issues"])
+        with st.expander("➕ Add Custom Holiday"):
+            custom_date = st.date_input("Date", key="custom_holiday_date")
+            custom_name = st.text_input("Holiday Name", key="custom_holiday_name")
+            if st.button("Add Holiday"):
+                st.success(f"Added: {custom_date} - {custom_name}")
+
+
+# =============================================================================
+# CATEGORIES TAB
+# =============================================================================
+
+@fragment
+def render_categories_tab(config):
+    """Render the Categories settings tab."""
+    
+    categories_config = config.get('categories', default={})
+    
+    st.subheader("Ticket Categories")
+    st.caption("Define categories and their detection keywords")
+    
+    st.toggle(
+        "Auto-detect categories",
+        value=categories_config.get('auto_detect', True),
+        key="auto_categories",
+        help="Automatically categorize tickets based on keywords"
+    )
+    
+    st.markdown("##### Category Definitions")
+    
+    categories = categories_config.get('custom', [])
+    
+    for i, cat in enumerate(categories):
+        with st.expander(f"🏷️ {cat['name']}", expanded=False):
+            col1, col2 = st.columns([1, 2])
+            with col1:
+                st.text_input("Name", value=cat['name'], key=f"cat_name_{i}")
+            with col2:
+                st.text_input(
+                    "Keywords (comma-separated)",
+                    value=', '.join(cat['keywords']),
+                    key=f"cat_keywords_{i}"
+                )
+            if st.button("🗑️ Remove", key=f"cat_remove_{i}"):
+                st.warning("Category removed (save to apply)")
+    
+    st.markdown("---")
+    with st.expander("➕ Add New Category"):
+        new_cat_name = st.text_input("Category Name", key="new_cat_name")
+        new_cat_keywords = st.text_input("Keywords (comma-separated)", key="new_cat_keywords")
+        if st.button("Add Category"):
+            st.success(f"Added category: {new_cat_name}")
+
+
+# =============================================================================
+# PATTERNS TAB
+# =============================================================================
+
+@fragment
+def render_patterns_tab(config):
+    """Render the Patterns settings tab."""
+    
+    canned_responses_config = config.get('canned_responses', default={})
+    promise_tracking_config = config.get('promise_tracking', default={})
+    dependency_tracking_config = config.get('dependency_tracking', default={})
+    issues_config = config.get('config_issues', default={})
+    
+    st.subheader("Detection Patterns")
+    st.caption("Configure patterns for detecting canned responses, promises, dependencies, etc.")
+    
+    pattern_tabs = st.tabs(["Canned Responses", "24h Promises", "Dependencies", "Config Issues"])
+    
+    # Canned Responses
+    with pattern_tabs[0]:
+        detect_canned = st.toggle(
+            "Detect canned responses",
+            value=canned_responses_config.get('detect', True),
+            key="detect_canned"
+        )
         
-        # Canned Responses
-        with pattern_tabs[0]:
-            st.toggle(
-                "Detect canned responses",
-                value=config.get('canned_responses', 'detect', default=True),
-                key="detect_canned"
-            )
-            
+        if detect_canned:
             st.markdown("##### Template Patterns")
-            patterns = config.get('canned_responses', 'patterns', default={})
+            patterns = canned_responses_config.get('patterns', {})
             
             for name, pattern in patterns.items():
                 col1, col2 = st.columns([1, 3])
@@ -639,50 +860,53 @@ def render_settings():
                     st.text_input("Name", value=name, key=f"canned_{name}_name", disabled=True)
                 with col2:
                     st.text_input("Pattern", value=pattern, key=f"canned_{name}_pattern")
+    
+    # 24h Promises
+    with pattern_tabs[1]:
+        track_promises = st.toggle(
+            "Track 24h promises",
+            value=promise_tracking_config.get('enabled', True),
+            key="track_promises"
+        )
         
-        # 24h Promises
-        with pattern_tabs[1]:
-            st.toggle(
-                "Track 24h promises",
-                value=config.get('promise_tracking', 'enabled', default=True),
-                key="track_promises"
-            )
-            
-            st.number_input(
-                "Promise Window (hours)",
-                value=config.get('promise_tracking', 'window_hours', default=24),
-                min_value=1,
-                max_value=72,
-                key="promise_window"
-            )
-            
+        st.number_input(
+            "Promise Window (hours)",
+            value=promise_tracking_config.get('window_hours', 24),
+            min_value=1,
+            max_value=72,
+            key="promise_window"
+        )
+        
+        if track_promises:
             st.markdown("##### Promise Detection Patterns")
-            promise_patterns = config.get('promise_tracking', 'patterns', default=[])
+            promise_patterns = promise_tracking_config.get('patterns', [])
             for i, pattern in enumerate(promise_patterns):
                 st.text_input(f"Pattern {i+1}", value=pattern, key=f"promise_pattern_{i}")
+    
+    # Dependencies
+    with pattern_tabs[2]:
+        track_deps = st.toggle(
+            "Track internal dependencies",
+            value=dependency_tracking_config.get('enabled', True),
+            key="track_deps"
+        )
         
-        # Dependencies
-        with pattern_tabs[2]:
-            st.toggle(
-                "Track internal dependencies",
-                value=config.get('dependency_tracking', 'enabled', default=True),
-                key="track_deps"
-            )
-            
+        if track_deps:
             st.markdown("##### Dependency Detection Patterns")
-            dep_patterns = config.get('dependency_tracking', 'patterns', default=[])
+            dep_patterns = dependency_tracking_config.get('patterns', [])
             for i, pattern in enumerate(dep_patterns):
                 st.text_input(f"Pattern {i+1}", value=pattern, key=f"dep_pattern_{i}")
+    
+    # Config Issues
+    with pattern_tabs[3]:
+        detect_config = st.toggle(
+            "Detect configuration issues",
+            value=issues_config.get('detect', True),
+            key="detect_config"
+        )
         
-        # Config Issues
-        with pattern_tabs[3]:
-            st.toggle(
-                "Detect configuration issues",
-                value=config.get('config_issues', 'detect', default=True),
-                key="detect_config"
-            )
-            
-            issue_types = config.get('config_issues', 'types', default={})
+        if detect_config:
+            issue_types = issues_config.get('types', {})
             
             for issue_key, issue_data in issue_types.items():
                 with st.expander(f"⚙️ {issue_data['name']}"):
@@ -696,295 +920,229 @@ def render_settings():
                         value=', '.join(issue_data.get('fault_indicators', [])),
                         key=f"config_{issue_key}_fault"
                     )
+
+
+# =============================================================================
+# AI TAB
+# =============================================================================
+
+@fragment
+def render_ai_tab(config):
+    """Render the AI settings tab."""
     
-    # =========================================================================
-    # AI TAB
-    # =========================================================================
-    with tabs[6]:
-        st.subheader("AI Configuration")
-        st.caption("Configure AI providers for intelligent analysis")
+    ai_config = config.get('ai', default={})
+    ollama_config = config.get('ai', 'ollama', default={})
+    
+    st.subheader("AI Configuration")
+    st.caption("Configure AI providers for intelligent analysis")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("##### AI Provider")
         
-        col1, col2 = st.columns(2)
+        current_provider = ai_config.get('provider', 'ollama')
         
-        with col1:
-            st.markdown("##### AI Provider")
-            
-            providers = ['ollama', 'openai', 'anthropic', 'none']
-            current_provider = config.get('ai', 'provider', default='ollama')
-            
-            provider = st.selectbox(
-                "Provider",
-                providers,
-                index=providers.index(current_provider) if current_provider in providers else 0,
-                format_func=lambda x: {'ollama': '🦙 Ollama (Local)', 'openai': '🤖 OpenAI', 
-                                      'anthropic': '🔷 Anthropic', 'none': '❌ Disabled'}.get(x, x),
-                key="ai_provider"
-            )
-            
-            if provider == 'ollama':
-                st.text_input(
-                    "Ollama URL",
-                    value=config.get('ai', 'ollama', 'base_url', default='http://localhost:11434'),
-                    key="ollama_url"
-                )
-                st.text_input(
-                    "Model",
-                    value=config.get('ai', 'ollama', 'model', default='qwen2.5:14b'),
-                    key="ollama_model"
-                )
-            
-            elif provider == 'openai':
-                st.text_input(
-                    "API Key",
-                    type="password",
-                    key="openai_key"
-                )
-                st.selectbox(
-                    "Model",
-                    ['gpt-4o-mini', 'gpt-4o', 'gpt-4-turbo'],
-                    key="openai_model"
-                )
-            
-            st.slider(
-                "Temperature",
-                min_value=0.0,
-                max_value=1.0,
-                value=0.3,
-                step=0.1,
-                key="ai_temperature"
-            )
+        provider = st.selectbox(
+            "Provider",
+            AI_PROVIDERS,
+            index=AI_PROVIDERS.index(current_provider) if current_provider in AI_PROVIDERS else 0,
+            format_func=AI_PROVIDER_LABELS.get,
+            key="ai_provider"
+        )
         
-        with col2:
-            st.markdown("##### AI Features")
-            
-            features = config.get('ai', 'features', default={})
-            
-            st.toggle(
-                "Issue Clustering",
-                value=features.get('issue_clustering', True),
-                key="ai_clustering",
-                help="Group similar tickets into issue clusters"
+        if provider == 'ollama':
+            st.text_input(
+                "Ollama URL",
+                value=ollama_config.get('base_url', 'http://localhost:11434'),
+                key="ollama_url"
             )
-            
-            st.toggle(
-                "Root Cause Analysis",
-                value=features.get('root_cause_analysis', True),
-                key="ai_root_cause",
-                help="Identify root causes for issue clusters"
+            st.text_input(
+                "Model",
+                value=ollama_config.get('model', 'qwen2.5:14b'),
+                key="ollama_model"
             )
-            
-            st.toggle(
-                "Auto Categorization",
-                value=features.get('auto_categorization', True),
-                key="ai_auto_cat",
-                help="Automatically categorize uncategorized tickets"
+        
+        elif provider == 'openai':
+            st.text_input(
+                "API Key",
+                type="password",
+                key="openai_key"
             )
-            
-            st.toggle(
-                "Sentiment Analysis",
-                value=features.get('sentiment_analysis', False),
-                key="ai_sentiment",
-                help="Analyze customer sentiment in messages"
+            st.selectbox(
+                "Model",
+                ['gpt-4o-mini', 'gpt-4o', 'gpt-4-turbo'],
+                key="openai_model"
             )
-            
-            if st.button("🔗 Test Connection", type="secondary"):
-                with st.spinner("Testing AI connection..."):
-                    # Simulate test
-                    import time
-                    time.sleep(1)
-                    st.success("✓ AI connection successful!")
-    
-    # =========================================================================
-    # INTEGRATIONS TAB
-    # =========================================================================
-    with tabs[7]:
-        st.subheader("Integrations")
-        st.caption("Connect to external ticket systems")
         
-        # Connector selector - allows for future connectors
-        connector_type = st.selectbox(
-            "Ticket System",
-            options=["Freshdesk", "Zendesk (Coming Soon)", "Jira (Coming Soon)", "ServiceNow (Coming Soon)"],
-            index=0,
-            help="Select your ticket management system"
+        st.slider(
+            "Temperature",
+            min_value=0.0,
+            max_value=1.0,
+            value=0.3,
+            step=0.1,
+            key="ai_temperature"
         )
+    
+    with col2:
+        st.markdown("##### AI Features")
         
-        st.divider()
+        features = ai_config.get('features', {})
         
-        if connector_type == "Freshdesk":
-            render_freshdesk_connector(config)
-        elif "Coming Soon" in connector_type:
-            st.info(f"🚧 {connector_type.replace(' (Coming Soon)', '')} integration is planned for a future release.")
-            st.caption("Contact us if you need this integration prioritized.")
+        st.toggle(
+            "Issue Clustering",
+            value=features.get('issue_clustering', True),
+            key="ai_clustering",
+            help="Group similar tickets into issue clusters"
+        )
         
-        st.markdown("---")
-        st.markdown("##### Agent Cache")
+        st.toggle(
+            "Root Cause Analysis",
+            value=features.get('root_cause_analysis', True),
+            key="ai_root_cause",
+            help="Identify root causes for issue clusters"
+        )
         
-        st.text_input(
-            "Agent Cache File",
-            value=config.get('agent_cache', 'file', default='.agent_cache.json'),
-            key="agent_cache_file"
+        st.toggle(
+            "Auto Categorization",
+            value=features.get('auto_categorization', True),
+            key="ai_auto_cat",
+            help="Automatically categorize uncategorized tickets"
         )
         
-        st.file_uploader(
-            "Upload Agent Excel (dl_agents.xlsx)",
-            type=['xlsx'],
-            key="agent_excel"
+        st.toggle(
+            "Sentiment Analysis",
+            value=features.get('sentiment_analysis', False),
+            key="ai_sentiment",
+            help="Analyze customer sentiment in messages"
         )
-    
-    # =========================================================================
-    # EXPORT TAB
-    # =========================================================================
-    with tabs[8]:
-        st.subheader("Export Settings")
-        st.caption("Configure report generation options")
         
-        col1, col2 = st.columns(2)
+        if st.button("🔗 Test Connection", type="secondary"):
+            # Check the provider as currently entered, not the saved config
+            from core.ai_service import get_ai_service
+            ai_service = get_ai_service({
+                'provider': provider,
+                'ollama': {
+                    'base_url': st.session_state.get('ollama_url', 'http://localhost:11434'),
+                    'model': st.session_state.get('ollama_model', 'qwen2.5:14b'),
+                },
+                'openai': {
+                    'api_key': st.session_state.get('openai_key', ''),
+                    'model': st.session_state.get('openai_model', 'gpt-4o-mini'),
+                },
+            })
+            with st.spinner("Testing AI connection..."):
+                connected = ai_service.test_connection()
+            if connected:
+                st.success("✓ AI connection successful!")
+            else:
+                st.error(f"❌ Failed: {ai_service.last_error or 'check the provider settings'}")
         
-        with col1:
-            st.markdown("##### Excel Export")
-            
-            st.toggle(
-                "Include charts",
-                value=config.get('export', 'excel', 'include_charts', default=True),
-                key="excel_charts"
-            )
-            
-            st.toggle(
-                "Include formulas",
-                value=config.get('export', 'excel', 'include_formulas', default=True),
-                key="excel_formulas"
-            )
-            
-            st.toggle(
-                "Password protect",
-                value=config.get('export', 'excel', 'password_protect', default=False),
-                key="excel_password"
-            )
+        st.markdown("##### Category Cache")
+        from core.category_cache import get_category_cache
+        category_cache = get_category_cache()
         
-        with col2:
-            st.markdown("##### PDF Export")
-            
-            st.toggle(
-                "Include charts",
-                value=config.get('export', 'pdf', 'include_charts', default=True),
-                key="pdf_charts"
-            )
-            
-            st.selectbox(
-                "Page Size",
-                ['A4', 'Letter', 'Legal'],
-                key="pdf_size"
-            )
+        # Categories are cached per provider, model and prompt; clearing forces
+        # every ticket to be sent to the model again on the next run
+        if st.button("🗑️ Clear Category Cache", type="secondary"):
+            category_cache.clear()
+            st.success("✓ Category cache cleared")
+        
+        st.caption(f"{category_cache.get_stats()['categories_cached']:,} ticket categories cached")
+
+
+# =============================================================================
+# INTEGRATIONS TAB
+# =============================================================================
+
+@fragment
+def render_integrations_tab(config):
+    """Render the Integrations settings tab."""
+    
+    st.subheader("Integrations")
+    st.caption("Connect to external ticket systems")
+    
+    # Connector selector - allows for future connectors
+    connector_type = st.selectbox(
+        "Ticket System",
+        options=["Freshdesk", "Zendesk (Coming Soon)", "Jira (Coming Soon)", "ServiceNow (Coming Soon)"],
+        index=0,
+        help="Select your ticket management system"
+    )
+    
+    st.divider()
+    
+    if connector_type == "Freshdesk":
+        render_freshdesk_connector(config)
+    elif "Coming Soon" in connector_type:
+        st.info(f"🚧 {connector_type.replace(' (Coming Soon)', '')} integration is planned for a future release.")
+        st.caption("Contact us if you need this integration prioritized.")
     
-    # =========================================================================
-    # SAVE BUTTON
-    # =========================================================================
     st.markdown("---")
+    st.markdown("##### Agent Cache")
     
-    col1, col2, col3 = st.columns([1, 1, 2])
+    st.text_input(
+        "Agent Cache File",
+        value=config.get('agent_cache', 'file', default='.agent_cache.json'),
+        key="agent_cache_file"
+    )
+    
+    st.file_uploader(
+        "Upload Agent Excel (dl_agents.xlsx)",
+        type=['xlsx'],
+        key="agent_excel"
+    )
+
+
+# =============================================================================
+# EXPORT TAB
+# =============================================================================
+
+@fragment
+def render_export_tab(config):
+    """Render the Export settings tab."""
+    
+    excel_config = config.get('export', 'excel', default={})
+    
+    st.subheader("Export Settings")
+    st.caption("Configure report generation options")
+    
+    col1, col2 = st.columns(2)
     
     with col1:
-        if st.button("💾 Save Configuration", type="primary", use_container_width=True):
-            # Collect all settings from session state widgets and save
-            try:
-                # Branding settings
-                if 'brand_company_name' in st.session_state:
-                    config.set('branding', 'company_name', st.session_state.brand_company_name)
-                if 'brand_platform_name' in st.session_state:
-                    config.set('branding', 'platform_name', st.session_state.brand_platform_name)
-                if 'brand_tagline' in st.session_state:
-                    config.set('branding', 'tagline', st.session_state.brand_tagline)
-                if 'brand_primary_color' in st.session_state:
-                    config.set('branding', 'primary_color', st.session_state.brand_primary_color)
-                if 'brand_secondary_color' in st.session_state:
-                    config.set('branding', 'secondary_color', st.session_state.brand_secondary_color)
-                if 'brand_accent_color' in st.session_state:
-                    config.set('branding', 'accent_color', st.session_state.brand_accent_color)
-                
-                # Industry settings
-                if 'org_name' in st.session_state:
-                    config.set('industry', 'name', st.session_state.org_name)
-                if 'entity_type' in st.session_state:
-                    config.set('industry', 'primary_entity', st.session_state.entity_type)
-                if 'entity_field' in st.session_state:
-                    config.set('industry', 'entity_field', st.session_state.entity_field)
-                
-                # SLA settings
-                if 'sla_frt' in st.session_state:
-                    config.set('sla', 'first_response_hours', st.session_state.sla_frt)
-                if 'sla_resolution' in st.session_state:
-                    config.set('sla', 'resolution_hours', st.session_state.sla_resolution)
-                if 'sla_stale' in st.session_state:
-                    config.set('sla', 'stale_threshold_days', st.session_state.sla_stale)
-                
-                # Working hours
-                if 'timezone' in st.session_state:
-                    config.set('working_hours', 'timezone', st.session_state.timezone)
-                if 'work_start' in st.session_state:
-                    config.set('working_hours', 'start_hour', st.session_state.work_start)
-                if 'work_end' in st.session_state:
-                    config.set('working_hours', 'end_hour', st.session_state.work_end)
-                
-                # AI settings - CRITICAL for model persistence
-                if 'ai_provider' in st.session_state:
-                    config.set('ai', 'provider', st.session_state.ai_provider)
-                if 'ollama_url' in st.session_state:
-                    config.set('ai', 'ollama', 'base_url', st.session_state.ollama_url)
-                if 'ollama_model' in st.session_state:
-                    config.set('ai', 'ollama', 'model', st.session_state.ollama_model)
-                if 'ai_temperature' in st.session_state:
-                    config.set('ai', 'ollama', 'temperature', st.session_state.ai_temperature)
-                if 'openai_key' in st.session_state:
-                    config.set('ai', 'openai', 'api_key', st.session_state.openai_key)
-                if 'openai_model' in st.session_state:
-                    config.set('ai', 'openai', 'model', st.session_state.openai_model)
-                
-                # AI features
-                if 'ai_clustering' in st.session_state:
-                    config.set('ai', 'features', 'issue_clustering', st.session_state.ai_clustering)
-                if 'ai_root_cause' in st.session_state:
-                    config.set('ai', 'features', 'root_cause_analysis', st.session_state.ai_root_cause)
-                if 'ai_auto_cat' in st.session_state:
-                    config.set('ai', 'features', 'auto_categorization', st.session_state.ai_auto_cat)
-                if 'ai_sentiment' in st.session_state:
-                    config.set('ai', 'features', 'sentiment_analysis', st.session_state.ai_sentiment)
-                
-                # Freshdesk settings
-                if 'fd_domain' in st.session_state:
-                    config.set('freshdesk', 'domain', st.session_state.fd_domain)
-                if 'fd_api_key' in st.session_state:
-                    config.set('freshdesk', 'api_key', st.session_state.fd_api_key)
-                if 'fd_group' in st.session_state:
-                    config.set('freshdesk', 'group_id', st.session_state.fd_group)
-                if 'fd_days' in st.session_state:
-                    config.set('freshdesk', 'days_to_fetch', st.session_state.fd_days)
-                
-                # Now save to disk
-                config.save()
-                st.success("✅ Configuration saved!")
-                st.caption(f"Model set to: {st.session_state.get('ollama_model', 'N/A')}")
-            except Exception as e:
-                st.error(f"Error saving: {e}")
+        st.markdown("##### Excel Export")
+        
+        st.toggle(
+            "Include charts",
+            value=excel_config.get('include_charts', True),
+            key="excel_charts"
+        )
+        
+        st.toggle(
+            "Include formulas",
+            value=excel_config.get('include_formulas', True),
+            key="excel_formulas"
+        )
+        
+        st.toggle(
+            "Password protect",
+            value=excel_config.get('password_protect', False),
+            key="excel_password"
+        )
     
     with col2:
-        if st.button("🔄 Reset to Defaults", use_container_width=True):
-            if st.session_state.get('confirm_reset'):
-                # Reset
-                st.session_state.config = DEFAULT_CONFIG.copy()
-                st.success("✓ Reset to defaults!")
-                del st.session_state['confirm_reset']
-            else:
-                st.session_state['confirm_reset'] = True
-                st.warning("Click again to confirm reset")
-    
-    with col3:
-        st.download_button(
-            "📥 Export Config (YAML)",
-            data=yaml.dump(config.to_dict(), default_flow_style=False),
-            file_name="ftex_config.yaml",
-            mime="text/yaml",
-            use_container_width=True
+        st.markdown("##### PDF Export")
+        
+        st.toggle(
+            "Include charts",
+            value=config.get('export', 'pdf', 'include_charts', default=True),
+            key="pdf_charts"
+        )
+        
+        st.selectbox(
+            "Page Size",
+            ['A4', 'Letter', 'Legal'],
+            key="pdf_size"
         )
 
 